@@ -1,34 +1,49 @@
 # Import required libraries
-import pickle
-import copy
 import pathlib
 import dash
-import math
-import time
-import json
-import datetime as dt
-import pandas as pd
 import plotly.graph_objs as go
-from dash.dependencies import Input, Output, State, ClientsideFunction
+from dash.dependencies import Input, Output, ClientsideFunction
 import dash_core_components as dcc
 import dash_html_components as html
-import requests
+import os
+import threading
+import flask
 
-# get relative data folder
+from gasapi import finite_json
+from recs_cache import FeedCache, RecsCache
+from snapshot import SnapshotReader
+
+# the oracle writes its outputs next to this file
 PATH = pathlib.Path(__file__).parent
-DATA_PATH = PATH.joinpath("data").resolve()
 
 app = dash.Dash(
     __name__, meta_tags=[{"name": "viewport", "content": "width=device-width"}]
 )
 server = app.server
 
-# Create controls
+# latest recommendation, read once per change for every callback and viewer in this process
+recs_cache = RecsCache(PATH.joinpath("predictions", "API.json"),
+                       snapshot=SnapshotReader(PATH.joinpath("predictions", "oracle.snapshot"))).start()
+
+### ethgasstation's recommendation for comparison, fetched once per block in the background
+ETHGASSTATION_URL = os.environ.get("ETHGASSTATION_URL", "https://ethgasstation.info/json/ethgasAPI.json")
+
+
+def feed_interval():
+    recs = recs_cache.get()
+    return max(1, recs.get("block_time", 15)) if recs else 15
 
 
-# Load data
-df = pd.read_csv(DATA_PATH.joinpath("alltx.csv"), low_memory=False)
+ethgasstation = FeedCache(ETHGASSTATION_URL, interval=feed_interval).start()
 
+### /recs/stream connections held open at once per worker process.  each holds one of the worker's gunicorn threads
+### (--threads in the Procfile) for as long as the page is open, so this stays well below it to leave threads for the
+### dashboard's own requests.  a viewer over the limit is told to reconnect after STREAM_RETRY_MS
+MAX_STREAMS = int(os.environ.get("MAX_STREAMS", 50))
+STREAM_RETRY_MS = 30000
+streams = threading.BoundedSemaphore(MAX_STREAMS)
+
+# Create controls
 
 
 # Create app layout
@@ -91,41 +106,38 @@ app.layout = html.Div(
                     html.Div(
                             [
                                 html.Div(
-                                    [dcc.Interval(id='interval1', interval=3 * 1000, n_intervals=0),
-                                    html.H4(id="Block Number"), html.H6("Block Number")],
+                                    [html.H4(id="Block Number"), html.H6("Block Number")],
                                     id="dangerously",
                                     className="mini_container",
                                     style={"width": "300px",'text-align':'center','font-size':'large','margin-top':'0px','margin-bottom':'0px'},
                                 ),
                                 html.Div(
-                                    [dcc.Interval(id='interval2', interval=3 * 1000, n_intervals=0),
-                                    html.H4(id="Safe"), html.H6("Safe < 30 min")],
+                                    [html.H4(id="Safe"), html.H6("Safe < 30 min")],
                                     id="safe",
                                     className="mini_container",
                                     style={"width": "300px",'text-align':'center','font-size':'large','margin-top':'0px','margin-bottom':'0px'},
                                 ),
                                 html.Div(
-                                    [dcc.Interval(id='interval3', interval=3 * 1000, n_intervals=0),
-                                    html.H4(id="Standard"), html.H6("Standard < 5 min")],
+                                    [html.H4(id="Standard"), html.H6("Standard < 5 min")],
                                     id="standard",
                                     className="mini_container",
                                     style={"width": "300px",'text-align':'center','font-size':'large','margin-top':'0px','margin-bottom':'0px'},
                                 ),
                                 html.Div(
-                                    [dcc.Interval(id='interval4', interval=3 * 1000, n_intervals=0),
-                                    html.H4(id="Fast"), html.H6("Fast < 2 min")],
+                                    [html.H4(id="Fast"), html.H6("Fast < 2 min")],
                                     id="fast",
                                     className="mini_container",
                                     style={"width": "300px",'text-align':'center','font-size':'large','margin-top':'0px','margin-bottom':'0px'},
                                 ),
                                 html.Div(
-                                    [dcc.Interval(id='interval5', interval=3 * 1000, n_intervals=0),
-                                    html.H4(id="Fastest"), html.H6("Fastest ~ 1 Block")],
+                                    [html.H4(id="Fastest"), html.H6("Fastest ~ 1 Block")],
                                     id="fastest",
                                     className="mini_container",
                                     style={"width": "300px",'text-align':'center','font-size':'large','margin-top':'0px','margin-bottom':'0px'},
                                 ),
 
+                                # ticks in the browser only; the recs arrive over /recs/stream
+                                dcc.Interval(id='recs-tick', interval=500, n_intervals=0),
                             ],
                             id="",
                             className="row container-display",
@@ -153,72 +165,66 @@ app.layout = html.Div(
     style={"display": "flex", "flex-direction": "column",'margin-top':'0px'},
 )
 
-@app.callback(dash.dependencies.Output('Block Number', 'children'),
-    [dash.dependencies.Input('interval1', 'n_intervals')])
-def update(n_intervals):
-    with open('./predictions/API.json') as f:
-        api = json.load(f)
-    return api['blockNum']
-
-@app.callback(dash.dependencies.Output('Safe', 'children'),
-    [dash.dependencies.Input('interval2', 'n_intervals')])
-def update(n_intervals):
-    with open('./predictions/API.json') as f:
-        api = json.load(f)
-    return api['safeLow']
-
-
-@app.callback(dash.dependencies.Output('Standard', 'children'),
-    [dash.dependencies.Input('interval3', 'n_intervals')])
-def update(n_intervals):
-    with open('./predictions/API.json') as f:
-        api = json.load(f)
-    return api['standard']
-
-@app.callback(dash.dependencies.Output('Fast', 'children'),
-    [dash.dependencies.Input('interval4', 'n_intervals')])
-def update(n_intervals):
-    with open('./predictions/API.json') as f:
-        api = json.load(f)
-    return api['fast']
-
-@app.callback(dash.dependencies.Output('Fastest', 'children'),
-    [dash.dependencies.Input('interval5', 'n_intervals')])
-def update(n_intervals):
-    with open('./predictions/API.json') as f:
-        api = json.load(f)
-    return api['fastest']
+@server.route('/recs/stream')
+def recs_stream():
+    """server-sent events: the current recs on connect, then each new block's recs as it lands"""
+    headers = {'Cache-Control': 'no-cache'}
+    if not streams.acquire(blocking=False):
+        # EventSource reconnects once a stream ends, after the last retry it was sent
+        return flask.Response('retry: %d\n\n' % STREAM_RETRY_MS, mimetype='text/event-stream', headers=headers)
+
+    def events():
+        version = None
+        while True:
+            new_version, recs = recs_cache.wait(version, timeout=15)
+            if new_version == version:
+                yield ': keepalive\n\n'
+                continue
+            version = new_version
+            yield 'data: %s\n\n' % finite_json(recs)
+    response = flask.Response(events(), mimetype='text/event-stream', headers=headers)
+    # close() runs when the viewer goes away, even before the first event
+    response.call_on_close(streams.release)
+    return response
+
+app.clientside_callback(
+    ClientsideFunction(namespace='recs', function_name='update'),
+    [Output('Block Number', 'children'),
+     Output('Safe', 'children'),
+     Output('Standard', 'children'),
+     Output('Fast', 'children'),
+     Output('Fastest', 'children')],
+    [Input('recs-tick', 'n_intervals')])
 
 @app.callback(dash.dependencies.Output('main-graph', 'figure'),
     [dash.dependencies.Input('graph-update', 'n_intervals')])
 def update(n_intervals):
     layout = go.Layout(paper_bgcolor='rgba(0,0,0,0)',
     plot_bgcolor='rgba(0,0,0,0)',showlegend=True,xaxis={'title':'Transaction Gas Budgets'},yaxis={'title':'Current Recommended Gas Price'})
-    with open('./predictions/API.json') as f:
-        api = json.load(f)
-
-        print(list(api.keys()))
-    r = requests.get("https://ethgasstation.info/json/ethgasAPI.json")
-    ethgasStation_dict = dict((k, r.json()[k]) for k in ('safeLow', 'average', 'fast', 'fastest','block_time'))
-
-    ethgasStation_dict['standard'] = ethgasStation_dict['average']
-    del ethgasStation_dict['average']
-    print(ethgasStation_dict)
+    api = recs_cache.get()
+    if api is None:
+        raise dash.exceptions.PreventUpdate
+    api = dict(api)
     del api["blockNum"]
-    ethgasStation = [x / 10 for x in list(ethgasStation_dict.values())]
-    print(ethgasStation)
-    ethgasStation[-2] = ethgasStation[-2]*10
     trace1 = go.Bar(x=list(api.keys()),
                 y=list(api.values()),
                 name='Squid Predict',
                 marker_color='rgb(0, 205, 233)'
                 )
-    trace2 = go.Bar(x=list(ethgasStation_dict.keys()),
-            y=ethgasStation,
-            name='Eth Gas Predict',
-            marker_color='rgb(0, 118, 221)'
-            )
-    data = [trace1,trace2]
+    data = [trace1]
+    egs = ethgasstation.get()
+    if egs is not None:
+        ethgasStation_dict = dict((k, egs[k]) for k in ('safeLow', 'average', 'fast', 'fastest', 'block_time'))
+        ethgasStation_dict['standard'] = ethgasStation_dict['average']
+        del ethgasStation_dict['average']
+        ethgasStation = [x / 10 for x in list(ethgasStation_dict.values())]
+        ethgasStation[-2] = ethgasStation[-2]*10
+        trace2 = go.Bar(x=list(ethgasStation_dict.keys()),
+                y=ethgasStation,
+                name='Eth Gas Predict',
+                marker_color='rgb(0, 118, 221)'
+                )
+        data.append(trace2)
     return go.Figure(data=data, layout=layout)
 
 # Main
@@ -0,0 +1,23 @@
+// keeps the latest recommendation pushed by /recs/stream and hands it to the
+// tiles callback; EventSource reconnects on its own if the stream drops
+(function() {
+  var latest = null;
+  var shown = null;
+  var source = new EventSource("/recs/stream");
+  source.onmessage = function(event) {
+    latest = JSON.parse(event.data);
+  };
+
+  if (!window.dash_clientside) {
+    window.dash_clientside = {};
+  }
+  window.dash_clientside.recs = {
+    update: function(n_intervals) {
+      if (latest === null || latest === shown) {
+        throw window.dash_clientside.PreventUpdate;
+      }
+      shown = latest;
+      return [latest.blockNum, latest.safeLow, latest.standard, latest.fast, latest.fastest];
+    }
+  };
+})();
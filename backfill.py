@@ -0,0 +1,42 @@
+"""
+concurrent block fetching for startup and catch-up
+"""
+import itertools
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Backfill():
+    """
+    runs fetch(block_numbers) over a range of blocks in chunks of `batch_size`
+    on a thread pool, with up to `concurrency` chunks in flight, and hands the
+    fetched blocks back one at a time in block order.  fetch returns one result
+    per block number it is given.  several Backfills can share one `pool`.
+    """
+    def __init__(self, fetch, concurrency=8, batch_size=1, pool=None):
+        self.fetch = fetch
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.pool = ThreadPoolExecutor(max_workers=concurrency) if pool is None else pool
+
+    def _chunks(self, start, stop):
+        for first in range(start, stop, self.batch_size):
+            yield list(range(first, min(first + self.batch_size, stop)))
+
+    def blocks(self, start, stop):
+        """yield the fetched result for each block in range(start, stop), in order"""
+        chunks = self._chunks(start, stop)
+        pending = deque(self.pool.submit(self.fetch, chunk) for chunk in itertools.islice(chunks, self.concurrency))
+        try:
+            while pending:
+                results = pending.popleft().result()
+                for chunk in itertools.islice(chunks, 1):
+                    pending.append(self.pool.submit(self.fetch, chunk))
+                for result in results:
+                    yield result
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False)
@@ -0,0 +1,119 @@
+"""
+load test for the oracle's http api (gasapi.GasAPI): keep-alive clients
+hammering /gas and /predictTable, plain and with If-None-Match, reporting
+p50/p99 latency and requests per second.  the api runs in its own process
+with recs from a synthetic block window, or pass the base url of a running
+oracle to test that instead
+
+run from the repo root:  python -m benchmarks.bench_api [seconds] [connections] [url]
+"""
+import asyncio
+import multiprocessing
+import sys
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+import gasExpress
+from benchmarks.synthetic import make_chain
+from blockring import BlockRing
+from gasapi import GasAPI
+from hashpower import HashpowerWindow
+
+CLIENT_PROCESSES = 4
+
+
+def serve(port, ready):
+    chain = make_chain(8939000, gasExpress.HISTORY_BLOCKS, n_tx=200)
+    history = BlockRing(gasExpress.HISTORY_BLOCKS)
+    window = HashpowerWindow(200)
+    for block_obj in chain:
+        block_df = gasExpress.block_to_dataframe(block_obj)
+        block_sumdf = gasExpress.process_block_data(block_df, block_obj)
+        history.append(block_df, block_sumdf)
+        window.add_block(block_sumdf)
+    block = history.newest + 3
+    hashpower, block_time = window.analyze(block)
+    prediction_table = gasExpress.make_predictTable(block, history.alltx(), hashpower, block_time)
+    gprecs = gasExpress.get_gasprice_recs(prediction_table, block_time, block)
+    api = GasAPI('127.0.0.1', port)
+    api.publish(gprecs, prediction_table)
+    api.start()
+    ready.set()
+    while True:
+        time.sleep(60)
+
+
+async def fetch(reader, writer, request):
+    writer.write(request)
+    head = await reader.readuntil(b'\r\n\r\n')
+    status = int(head[9:12])
+    length, etag = 0, None
+    for line in head.split(b'\r\n'):
+        if line.lower().startswith(b'content-length:'):
+            length = int(line[15:])
+        elif line.lower().startswith(b'etag:'):
+            etag = line[5:].strip()
+    await reader.readexactly(length)
+    return status, etag
+
+
+async def connection(host, port, request, deadline, latencies):
+    reader, writer = await asyncio.open_connection(host, port)
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        await fetch(reader, writer, request)
+        latencies.append(time.perf_counter() - start)
+    writer.close()
+
+
+async def load(host, port, path, conditional, seconds, connections):
+    request = b'GET %s HTTP/1.1\r\nHost: %s\r\n\r\n' % (path.encode(), host.encode())
+    if conditional:
+        reader, writer = await asyncio.open_connection(host, port)
+        _, etag = await fetch(reader, writer, request)
+        writer.close()
+        request = request[:-2] + b'If-None-Match: ' + etag + b'\r\n\r\n'
+    latencies = []
+    deadline = time.perf_counter() + seconds
+    await asyncio.gather(*[connection(host, port, request, deadline, latencies) for _ in range(connections)])
+    return latencies
+
+
+def client(args):
+    return asyncio.run(load(*args))
+
+
+def run(host, port, path, conditional, seconds, connections):
+    per_process = max(1, connections // CLIENT_PROCESSES)
+    with multiprocessing.Pool(CLIENT_PROCESSES) as pool:
+        start = time.perf_counter()
+        results = pool.map(client, [(host, port, path, conditional, seconds, per_process)] * CLIENT_PROCESSES)
+        elapsed = time.perf_counter() - start
+    latencies = np.concatenate([np.array(r) for r in results])
+    print('%-14s %-12s %8.0f req/s   p50 %6.2f ms   p99 %6.2f ms'
+          % (path, 'If-None-Match' if conditional else 'GET', len(latencies) / elapsed,
+             np.percentile(latencies, 50) * 1e3, np.percentile(latencies, 99) * 1e3))
+
+
+def main(seconds=5, connections=64, url=None):
+    server = None
+    if url is None:
+        ready = multiprocessing.Event()
+        server = multiprocessing.Process(target=serve, args=(8765, ready), daemon=True)
+        server.start()
+        ready.wait()
+        url = 'http://127.0.0.1:8765'
+    parts = urlsplit(url)
+    print('%s, %d keep-alive connections from %d client processes, %d s per run'
+          % (url, connections, CLIENT_PROCESSES, seconds))
+    for path in ('/gas', '/predictTable'):
+        for conditional in (False, True):
+            run(parts.hostname, parts.port or 80, path, conditional, seconds, connections)
+    if server is not None:
+        server.terminate()
+
+
+if __name__ == '__main__':
+    main(*[int(arg) if i < 2 else arg for i, arg in enumerate(sys.argv[1:])])
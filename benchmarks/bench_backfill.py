@@ -0,0 +1,45 @@
+"""
+startup backfill against a local fake node with per-request latency:
+one block at a time vs concurrent and batched fetches
+
+run from the repo root:  python -m benchmarks.bench_backfill [latency_ms]
+"""
+import sys
+import time
+
+import gasExpress
+from backfill import Backfill
+from benchmarks.fakenode import FakeChain, FakeNodeServer
+from benchmarks.synthetic import make_chain
+from blockring import BlockRing
+from rpc import BatchRPC
+
+
+def load(start, stop, concurrency, batch_size):
+    history = BlockRing(gasExpress.HISTORY_BLOCKS)
+    backfill = Backfill(gasExpress.process_blocks_transactions, concurrency, batch_size)
+    begin = time.perf_counter()
+    for (mined_blockdf, block_obj) in backfill.blocks(start, stop):
+        history.append(mined_blockdf, gasExpress.process_block_data(mined_blockdf, block_obj))
+    elapsed = time.perf_counter() - begin
+    backfill.shutdown()
+    return history, elapsed
+
+
+def main(latency_ms=50):
+    blocks = make_chain(8939000, gasExpress.BACKFILL_BLOCKS, n_tx=200)
+    start, stop = blocks[0]['number'], blocks[-1]['number'] + 1
+    with FakeNodeServer(FakeChain(blocks, latency_ms / 1e3)) as node:
+        gasExpress.rpc = BatchRPC(node.url)
+        expected, _ = load(start, stop, 1, 1)
+        print('%d blocks, %d ms per request' % (len(blocks), latency_ms))
+        for concurrency, batch_size in ((1, 1), (8, 1), (16, 1), (1, 10), (4, 10), (8, 10)):
+            history, elapsed = load(start, stop, concurrency, batch_size)
+            assert (history.blockdata()['block_number'] == expected.blockdata()['block_number']).all()
+            assert (history.alltx().index == expected.alltx().index).all()
+            print('concurrency %3d batch %3d  %6.2f s  %7.1f blocks/s'
+                  % (concurrency, batch_size, elapsed, len(blocks) / elapsed))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
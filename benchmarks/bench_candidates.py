@@ -0,0 +1,74 @@
+"""
+the candidate model families on one synthetic alltx window: each one's
+fit / predict time, cpu time and holdout score, a refit of all of them
+inline against side by side in a process pool on shared feature arrays,
+and which candidates a cpu budget leaves in the next cycle
+
+run from the repo root:  python -m benchmarks.bench_candidates [workers] [tx_per_block]
+"""
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import gasExpress
+from benchmarks.synthetic import make_chain
+from blockring import BlockRing
+from hashpower import HashpowerWindow
+from models import REGISTRY, ModelManager, TrainingWorker
+
+
+def window(n_tx):
+    """an alltx window with hashpower_accepting, as master_control trains on"""
+    history = BlockRing(gasExpress.HISTORY_BLOCKS)
+    last200 = HashpowerWindow(200)
+    for block_obj in make_chain(8939000, gasExpress.HISTORY_BLOCKS, n_tx=n_tx):
+        block_df = gasExpress.block_to_dataframe(block_obj)
+        block_sumdf = gasExpress.process_block_data(block_df, block_obj)
+        history.append(block_df, block_sumdf)
+        last200.add_block(block_sumdf)
+    block = block_obj['number'] + 3
+    alltx = history.alltx()
+    gasExpress.make_predictTable(block, alltx, last200.analyze(block)[0], 15)
+    return alltx, block
+
+
+def main(workers=2, n_tx=100):
+    (alltx, block) = window(n_tx)
+    print("%d txs in the window, candidates %s" % (len(alltx), list(REGISTRY)))
+
+    models = ModelManager('always', candidates=list(REGISTRY))
+    start = time.perf_counter()
+    models.update(alltx, block)
+    inline = time.perf_counter() - start
+    print("%-24s %8s %10s %10s %8s" % ('candidate', 'score', 'fit ms', 'predict ms', 'cpu s'))
+    for (name, stats) in models.stats.items():
+        print("%-24s %8.4f %10.1f %10.1f %8.2f" % (name, stats['score'], stats['fit'] * 1e3,
+                                                     stats['predict'] * 1e3, stats['cpu']))
+    print("promoted %s, score %.4f" % (models.model_name, models.score))
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        parallel = ModelManager('always', candidates=list(REGISTRY))
+        start = time.perf_counter()
+        parallel.update(alltx, block, pool)
+        elapsed = time.perf_counter() - start
+        # same window, same seeds: the pool fits the same models
+        for name in REGISTRY:
+            assert np.isclose(parallel.stats[name]['score'], models.stats[name]['score']), name
+        assert parallel.model_name == models.model_name
+        print("refit of all candidates: inline %.2f s, %d worker processes %.2f s" % (inline, workers, elapsed))
+
+        trainer = TrainingWorker(ModelManager('always', candidates=list(REGISTRY)), pool=pool)
+        trainer.submit(alltx, block)
+        while trainer.model is None:
+            time.sleep(0.01)
+        print("TrainingWorker published %s in the background" % trainer.models.model_name)
+
+    cheapest = min(models.stats.values(), key=lambda stats: stats['cpu'])['cpu']
+    models.budget = cheapest * 1.5
+    print("with a %.2f cpu s budget the next cycle fits %s" % (models.budget, models.affordable()))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,57 @@
+"""
+cost of the ethgasstation comparison in the dashboard's main-graph callback:
+a request per callback as before against a FeedCache read, with a slow
+local stand-in for the feed, and what the cache serves when the feed fails
+
+run from the repo root:  python -m benchmarks.bench_feed [callbacks] [feed_latency]
+"""
+import sys
+import time
+
+import numpy as np
+import requests
+
+from benchmarks.fakenode import FakeFeedServer
+from recs_cache import FeedCache
+
+FEED = {'safeLow': 20.0, 'average': 30.0, 'fast': 100.0, 'fastest': 200.0, 'block_time': 13.5, 'blockNum': 9000000}
+
+
+def timed(read, callbacks):
+    times = []
+    for _ in range(callbacks):
+        start = time.perf_counter()
+        read()
+        times.append(time.perf_counter() - start)
+    return np.array(times)
+
+
+def report(name, times, requests_made):
+    print("%-8s  p50 %8.3f ms  p99 %8.3f ms  upstream requests %d" %
+          (name, np.percentile(times, 50) * 1e3, np.percentile(times, 99) * 1e3, requests_made))
+
+
+def main(callbacks=20, latency=0.2):
+    print("%d callbacks, feed answering in %.0f ms" % (callbacks, latency * 1e3))
+    with FakeFeedServer(FEED, latency=latency) as feed:
+        report('direct', timed(lambda: requests.get(feed.url).json(), callbacks), feed.requests)
+
+    with FakeFeedServer(FEED, latency=latency) as feed:
+        cache = FeedCache(feed.url, interval=15, timeout=1, ttl=2).start()
+        while cache.get() is None:
+            time.sleep(0.01)
+        report('cached', timed(cache.get, callbacks), feed.requests)
+
+        feed.status = 503
+        assert not cache.refresh() and cache.get() == FEED
+        print("feed down: stale copy served until ttl, error %r" % str(cache.error))
+        feed.status, feed.latency = 200, cache.timeout * 2
+        assert not cache.refresh() and cache.get() == FEED
+        print("feed slower than timeout: refresh gave up after %.1f s, stale copy still served" % cache.timeout)
+        time.sleep(cache.ttl)
+        assert cache.get() is None
+        print("after ttl: nothing served, comparison bars are left off the graph")
+
+
+if __name__ == '__main__':
+    main(*[int(arg) if i == 0 else float(arg) for i, arg in enumerate(sys.argv[1:])])
@@ -0,0 +1,50 @@
+"""
+replays a synthetic chain through HashpowerWindow and analyze_last200blocks,
+checks both give the same hashpower table and avg block time every block,
+and times them.
+
+run from the repo root:  python -m benchmarks.bench_hashpower
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+import gasExpress
+from benchmarks.synthetic import make_chain
+from blockring import BlockRing
+from hashpower import HashpowerWindow
+
+
+def main(n_blocks=600):
+    chain = make_chain(8939000, n_blocks, n_tx=50)
+    # out of order timestamps and skipped blocks exercise the interval rules
+    chain[100]['timestamp'] = chain[99]['timestamp'] - 5
+    del chain[300:303]
+    history = BlockRing(gasExpress.HISTORY_BLOCKS)
+    window = HashpowerWindow(200)
+    t_full = t_incr = 0.0
+    for block_obj in chain:
+        block_df = gasExpress.block_to_dataframe(block_obj)
+        block_sumdf = gasExpress.process_block_data(block_df, block_obj)
+        history.append(block_df, block_sumdf)
+        window.add_block(block_sumdf)
+        block = block_obj['number'] + 3
+
+        start = time.perf_counter()
+        expected, expected_time = gasExpress.analyze_last200blocks(block, history.blockdata())
+        t_full += time.perf_counter() - start
+        start = time.perf_counter()
+        hashpower, avg_time = window.analyze(block)
+        t_incr += time.perf_counter() - start
+
+        pd.testing.assert_frame_equal(hashpower, expected, check_dtype=False)
+        assert np.isclose(avg_time, expected_time), (block, avg_time, expected_time)
+    n = len(chain)
+    print('%d blocks replayed, tables match' % n)
+    print('analyze_last200blocks  %.3f ms/block' % (t_full / n * 1e3))
+    print('HashpowerWindow        %.3f ms/block' % (t_incr / n * 1e3))
+
+
+if __name__ == '__main__':
+    main()
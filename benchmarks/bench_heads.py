@@ -0,0 +1,62 @@
+"""
+how quickly each head source notices a new block, and how many
+eth_blockNumber requests it spends, against local fake http and
+websocket nodes mining blocks at random intervals
+
+run from the repo root:  python -m benchmarks.bench_heads [blocks] [block_time]
+"""
+import sys
+import threading
+import time
+
+import numpy as np
+
+from benchmarks.fakenode import FakeChain, FakeNodeServer, FakeWSNode
+from benchmarks.synthetic import make_chain
+from heads import HeadSource
+from rpc import BatchRPC
+
+
+def run(chain, heads, n_blocks, block_time):
+    """mine n_blocks in a thread; returns detection delays and polls used"""
+    mined = {}
+    rng = np.random.RandomState(0)
+
+    def miner():
+        for _ in range(n_blocks):
+            time.sleep(rng.exponential(block_time))
+            mined[chain.head + 1] = time.perf_counter()
+            chain.advance()
+
+    start_head = chain.head
+    requests = chain.requests
+    thread = threading.Thread(target=miner)
+    thread.start()
+    delays = []
+    for head in heads.heads():
+        if head in mined:
+            delays.append(time.perf_counter() - mined[head])
+        if head >= start_head + n_blocks:
+            break
+    thread.join()
+    return np.array(delays), chain.requests - requests
+
+
+def main(n_blocks=15, block_time=2.0):
+    n_blocks = int(n_blocks)
+    chain = FakeChain(make_chain(8939000, 10, n_tx=1))
+    with FakeNodeServer(chain) as http_node, FakeWSNode(chain) as ws_node:
+        rpc = BatchRPC(http_node.url)
+        sources = (('poll every 1s', HeadSource(rpc, None, block_time=0, min_interval=1.0)),
+                   ('adaptive poll', HeadSource(rpc, None, block_time=block_time)),
+                   ('newHeads ws', HeadSource(rpc, ws_node.url, block_time=block_time)))
+        time.sleep(0.5)
+        print('%d blocks, mean block time %.1f s' % (n_blocks, block_time))
+        for name, heads in sources:
+            delays, requests = run(chain, heads, n_blocks, block_time)
+            print('%-14s delay mean %6.0f ms  max %6.0f ms   %3d http requests'
+                  % (name, delays.mean() * 1e3, delays.max() * 1e3, requests))
+
+
+if __name__ == '__main__':
+    main(*[float(arg) for arg in sys.argv[1:]])
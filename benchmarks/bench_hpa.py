@@ -0,0 +1,58 @@
+"""
+hashpower accepting lookups for a block window of transactions:
+Series.apply(get_hpa) per row vs one get_hpa_batch call
+
+run from the repo root:  python -m benchmarks.bench_hpa
+"""
+import time
+
+import numpy as np
+
+import gasExpress
+from benchmarks.synthetic import make_chain
+from blockring import BlockRing
+from hashpower import HashpowerWindow
+
+
+def legacy_get_hpa(gasprice, hashpower):
+    """the previous scalar get_hpa"""
+    hpa = hashpower.loc[gasprice >= hashpower.index, 'hashp_pct']
+    if gasprice > hashpower.index.max():
+        hpa = 100
+    elif gasprice < hashpower.index.min():
+        hpa = 0
+    else:
+        hpa = hpa.max()
+    return ((hpa/100) * (hpa/100))*100
+
+
+def main():
+    chain = make_chain(8939000, gasExpress.HISTORY_BLOCKS, n_tx=200)
+    history = BlockRing(gasExpress.HISTORY_BLOCKS)
+    window = HashpowerWindow(200)
+    for block_obj in chain:
+        block_df = gasExpress.block_to_dataframe(block_obj)
+        block_sumdf = gasExpress.process_block_data(block_df, block_obj)
+        history.append(block_df, block_sumdf)
+        window.add_block(block_sumdf)
+    hashpower, _ = window.analyze(history.newest + 3)
+    gasprices = history.alltx()['round_gp_10gwei']
+
+    start = time.perf_counter()
+    expected = gasprices.apply(legacy_get_hpa, args=(hashpower,)).to_numpy()
+    t_old = time.perf_counter() - start
+    start = time.perf_counter()
+    got = gasExpress.get_hpa_batch(gasprices.to_numpy(), hashpower)
+    t_new = time.perf_counter() - start
+
+    assert np.allclose(got, expected, equal_nan=True)
+    grid = np.arange(0, 1010, 0.5)
+    assert np.allclose([legacy_get_hpa(gp, hashpower) for gp in grid],
+                       [gasExpress.get_hpa(gp, hashpower) for gp in grid])
+    print('%d transactions, results match' % len(gasprices))
+    print('apply(get_hpa)  %8.1f ms' % (t_old * 1e3))
+    print('get_hpa_batch   %8.2f ms' % (t_new * 1e3))
+
+
+if __name__ == '__main__':
+    main()
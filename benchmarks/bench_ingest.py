@@ -0,0 +1,47 @@
+"""
+per-block ingestion: old per-transaction DataFrame appends vs columnar build
+
+run from the repo root:  python -m benchmarks.bench_ingest
+"""
+import time
+
+import pandas as pd
+
+import gasExpress
+from benchmarks.synthetic import make_block
+
+
+def legacy_block_to_dataframe(block_obj):
+    """the previous process_block_transactions loop, one frame per tx"""
+    block_df = pd.DataFrame()
+    for transaction in block_obj['transactions']:
+        clean_tx = gasExpress.CleanTx(transaction)
+        block_df = pd.concat([block_df, clean_tx.to_dataframe()])
+    block_df['time_mined'] = block_obj['timestamp']
+    return block_df
+
+
+def best_of(func, block_obj, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(block_obj)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    print('%8s %12s %12s %9s' % ('txs', 'old (ms)', 'new (ms)', 'speedup'))
+    for n_tx in (300, 1000):
+        block_obj = make_block(8939307, n_tx)
+        old = legacy_block_to_dataframe(block_obj)
+        new = gasExpress.block_to_dataframe(block_obj)
+        assert (old.index == new.index).all()
+        assert (old['round_gp_10gwei'].values == new['round_gp_10gwei'].values).all()
+        t_old = best_of(legacy_block_to_dataframe, block_obj, 3)
+        t_new = best_of(gasExpress.block_to_dataframe, block_obj, 20)
+        print('%8d %12.1f %12.2f %8.0fx' % (n_tx, t_old * 1e3, t_new * 1e3, t_old / t_new))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+the pending tx pool on its own (adds, inclusion, the capacity bound and the
+demand lookups made each block), then fed end to end from local fake nodes
+announcing thousands of pending txs a second, over a polled pending tx
+filter and over a newPendingTransactions subscription
+
+run from the repo root:  python -m benchmarks.bench_mempool [txs] [tx_per_second]
+"""
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.fakenode import FakeChain, FakeNodeServer, FakeWSNode
+from benchmarks.synthetic import make_block, make_chain
+from mempool import PendingFeed, PendingPool
+from rpc import BatchRPC
+
+
+def columns(txs):
+    return ([tx['hash'] for tx in txs], [tx['gasPrice'] for tx in txs], [tx['gas'] for tx in txs])
+
+
+def bench_pool(n_txs):
+    txs = make_block(9000000, n_txs)['transactions']
+    (hashes, gas_prices, gas) = columns(txs)
+    capacity = n_txs // 4
+    pool = PendingPool(capacity=capacity, ttl=600)
+    start = time.perf_counter()
+    for i in range(0, n_txs, 1000):
+        pool.add_many(hashes[i:i + 1000], gas_prices[i:i + 1000], gas[i:i + 1000])
+    elapsed = time.perf_counter() - start
+    assert len(pool) == capacity and pool.dropped == n_txs - capacity
+    assert pool.counts.sum() == capacity and np.isclose(pool.gas.sum(), sum(gas[-capacity:]))
+    print("add       %8.0f tx/s   %d held of %d added, %d oldest dropped at capacity"
+          % (n_txs / elapsed, len(pool), pool.added, pool.dropped))
+
+    # a 200 tx block mined from the newest half
+    included = hashes[-capacity // 2:][::max(1, capacity // 400)][:200]
+    start = time.perf_counter()
+    pool.remove(included + hashes[:200])
+    elapsed = time.perf_counter() - start
+    assert pool.included == len(included)
+    print("remove    %8.3f ms for a %d tx block (%d were pending)" % (elapsed * 1e3, len(included) + 200, pool.included))
+
+    start = time.perf_counter()
+    for blocks in (120, 20, 8, 1):
+        pool.cheapest_clearing(blocks * 10000000)
+    elapsed = time.perf_counter() - start
+    print("floors    %8.3f ms for the four tiers" % (elapsed * 1e3))
+
+    pool.expire(now=time.time() + pool.ttl + 1)
+    assert len(pool) == 0 and pool.counts.sum() == 0 and abs(pool.gas.sum()) < 1e-6
+    print("expire    %d left after ttl, bucket totals back to zero" % len(pool))
+
+
+def feed(chain, pool, txs, rate):
+    """announce txs at `rate` a second in 50 ms batches; seconds until the pool holds them all"""
+    batch = max(1, int(rate / 20))
+    start = time.perf_counter()
+    for i in range(0, len(txs), batch):
+        chain.send_pending(txs[i:i + batch])
+        time.sleep(max(0, start + (i + batch) / rate - time.perf_counter()))
+    announced = time.perf_counter()
+    while pool.added < len(txs) and time.perf_counter() - announced < 30:
+        time.sleep(0.01)
+    return time.perf_counter() - start, time.perf_counter() - announced
+
+
+def bench_feed(n_txs, rate):
+    chain = FakeChain(make_chain(8939000, 10, n_tx=1))
+    with FakeNodeServer(chain) as http_node, FakeWSNode(chain) as ws_node:
+        rpc = BatchRPC(http_node.url)
+        for (name, url) in (('filter', None), ('subscribe', ws_node.url)):
+            pool = PendingPool()
+            pending = PendingFeed(rpc, pool, url, poll_interval=0.1).start()
+            time.sleep(0.5)
+            requests = chain.requests
+            txs = make_block(9100000 + len(name), n_txs)['transactions']
+            (elapsed, drain) = feed(chain, pool, txs, rate)
+            print("%-9s %8.0f tx/s   %d of %d pooled, last in %4.0f ms after the last announcement, %d http requests"
+                  % (name, pool.added / elapsed, pool.added, n_txs, drain * 1e3, chain.requests - requests))
+            # once mined they leave the pool
+            pool.remove([tx['hash'] for tx in txs])
+            assert len(pool) == 0
+
+
+def main(n_txs=20000, rate=5000):
+    bench_pool(n_txs * 10)
+    bench_feed(n_txs, rate)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,53 @@
+"""
+training cost per block for each ModelManager policy over a replayed
+synthetic chain
+
+run from the repo root:  python -m benchmarks.bench_models [blocks]
+"""
+import sys
+import time
+
+import numpy as np
+
+import gasExpress
+from benchmarks.synthetic import make_chain
+from blockring import BlockRing
+from hashpower import HashpowerWindow
+from models import ModelManager
+
+
+def replay(policy, chain, warmup):
+    history = BlockRing(gasExpress.HISTORY_BLOCKS)
+    window = HashpowerWindow(200)
+    models = ModelManager(policy)
+    times, scores = [], []
+    for i, block_obj in enumerate(chain):
+        block_df = gasExpress.block_to_dataframe(block_obj)
+        block_sumdf = gasExpress.process_block_data(block_df, block_obj)
+        history.append(block_df, block_sumdf)
+        window.add_block(block_sumdf)
+        if i < warmup:
+            continue
+        block = block_obj['number'] + 3
+        hashpower, _ = window.analyze(block)
+        alltx = history.alltx()
+        alltx['hashpower_accepting'] = gasExpress.get_hpa_batch(alltx['round_gp_10gwei'].to_numpy(), hashpower)
+        start = time.perf_counter()
+        _, score = models.update(alltx, block)
+        times.append(time.perf_counter() - start)
+        scores.append(score)
+    return models, np.array(times), np.array(scores)
+
+
+def main(blocks=40):
+    warmup = 100
+    chain = make_chain(8939000, warmup + blocks, n_tx=100)
+    print('%-8s %10s %10s %8s %6s %6s' % ('policy', 'mean ms', 'max ms', 'score', 'refit', 'warm'))
+    for policy in ModelManager.POLICIES:
+        models, times, scores = replay(policy, chain, warmup)
+        print('%-8s %10.1f %10.1f %8.3f %6d %6d' % (policy, times.mean() * 1e3, times.max() * 1e3,
+                                                    np.nanmean(scores), models.refits, models.warm_fits))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
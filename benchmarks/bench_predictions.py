@@ -0,0 +1,97 @@
+"""
+model output to recs: the previous row by row prediction frame, per price
+expected blocks and groupby/filter tiers vs the array path
+(ml_predictions + make_ml_predictions_table), checked to agree, then the
+array path on finer price grids and several gas limits
+
+run from the repo root:  python -m benchmarks.bench_predictions
+"""
+import math
+import time
+
+import numpy as np
+import pandas as pd
+
+import gasExpress
+from benchmarks.synthetic import make_chain
+from blockring import BlockRing
+from hashpower import HashpowerWindow
+from models import ModelManager
+
+
+def legacy_ml_predictions(model):
+    """the previous ml_predictions"""
+    df = pd.DataFrame(columns=['gas', 'round_gp_10gwei', 'tx_cost'])
+    for i in range(0, 1000, 10):
+        df.loc[i] = [21000, i, i*21000]
+    results = model.predict(df[['gas', 'round_gp_10gwei', 'tx_cost']])
+
+    def calc_expected_num_blocks(hpa):
+        if hpa < 100:
+            prob = 100 - hpa
+            return math.log(0.05)/math.log(prob/100)
+        return 1
+
+    return [(i, calc_expected_num_blocks(result)) for i, result in enumerate(results)]
+
+
+def legacy_make_ml_predictions_table(results):
+    """the previous tier lookup, without the fastest tier's mismatched `< 2` check"""
+    df = pd.DataFrame(results, columns=['gas_price', 'blocks'])
+    df = df.groupby(['blocks'], as_index=False).agg({'gas_price': 'min'}).sort_values('blocks', ascending=False)
+    tiers = []
+    for cutoff in gasExpress.ML_TIER_BLOCKS:
+        price = df[df['blocks'] < cutoff]['gas_price'].min()
+        tiers.append(float(price) if price != 0 else 1.0)
+    return tiers
+
+
+def trained_model():
+    chain = make_chain(8939000, gasExpress.HISTORY_BLOCKS, n_tx=100)
+    history = BlockRing(gasExpress.HISTORY_BLOCKS)
+    window = HashpowerWindow(200)
+    for block_obj in chain:
+        block_df = gasExpress.block_to_dataframe(block_obj)
+        block_sumdf = gasExpress.process_block_data(block_df, block_obj)
+        history.append(block_df, block_sumdf)
+        window.add_block(block_sumdf)
+    block = history.newest + 3
+    hashpower, _ = window.analyze(block)
+    alltx = history.alltx()
+    alltx['hashpower_accepting'] = gasExpress.get_hpa_batch(alltx['round_gp_10gwei'].to_numpy(), hashpower)
+    model, _ = ModelManager('always').update(alltx, block)
+    return model
+
+
+def timed(fn, repeat=20):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - start) / repeat
+
+
+def main():
+    model = trained_model()
+
+    def legacy():
+        return legacy_make_ml_predictions_table(legacy_ml_predictions(model))
+
+    def vectorized(gasprices=None, gas=gasExpress.ML_GAS):
+        return gasExpress.make_ml_predictions_table(gasExpress.ml_predictions(model, gasprices, gas), 15, 0)
+
+    old, t_old = timed(legacy)
+    new, t_new = timed(vectorized)
+    new = [new[tier] for tier in ('safeLow', 'standard', 'fast', 'fastest')]
+    assert np.allclose(old, new, equal_nan=True), (old, new)
+    print('recs %s' % new)
+    print('%-34s %8.2f ms' % ('row by row, 100 prices', t_old * 1e3))
+    print('%-34s %8.2f ms' % ('arrays, 100 prices', t_new * 1e3))
+    for (prices, gas) in [(np.arange(0, 100, 0.1), 21000),
+                          (np.arange(0, 100, 0.01), 21000),
+                          (np.arange(0, 100, 1), [21000, 50000, 100000, 250000, 1000000])]:
+        _, t = timed(lambda: gasExpress.ml_predictions(model, prices, gas))
+        print('%-34s %8.2f ms' % ('arrays, %d prices x %d gas limits' % (len(prices), np.size(gas)), t * 1e3))
+
+
+if __name__ == '__main__':
+    main()
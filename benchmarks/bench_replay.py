@@ -0,0 +1,35 @@
+"""
+replay.py end to end on a synthetic block archive: recommendation scores and
+blocks per second with the hashpower recs only ('none') and with model
+policies (default none, drift and every; 'always' refits 300 trees a block
+and takes minutes)
+
+run from the repo root:  python -m benchmarks.bench_replay [blocks] [policy ...]
+"""
+import sys
+import tempfile
+
+import gasExpress
+import replay
+from benchmarks.synthetic import make_chain
+from blockstore import BlockStore
+from models import ModelManager
+
+
+def main(blocks=100, *policies):
+    policies = policies or ('none', 'drift', 'every')
+    warmup = gasExpress.HISTORY_BLOCKS
+    with tempfile.TemporaryDirectory() as path:
+        store = BlockStore(path)
+        for block_obj in make_chain(8939000, warmup + blocks, n_tx=100):
+            block_df = gasExpress.block_to_dataframe(block_obj)
+            store.append(block_df, gasExpress.process_block_data(block_df, block_obj))
+        for policy in policies:
+            models = None if policy == 'none' else ModelManager(policy)
+            (scores, _, blocks_per_second, stages) = replay.replay(store.blocks(0, store.newest + 1), models, warmup)
+            print('\n%s' % policy)
+            replay.print_report(scores, blocks_per_second, stages)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) if i == 0 else arg for i, arg in enumerate(sys.argv[1:])])
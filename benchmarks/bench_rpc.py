@@ -0,0 +1,57 @@
+"""
+block fetch throughput against a local fake json-rpc node: a new connection
+per call (the old HTTPProvider pattern), pooled keep-alive single calls, and
+batched calls
+
+run from the repo root:  python -m benchmarks.bench_rpc [blocks] [latency_ms]
+"""
+import sys
+import time
+
+import requests
+
+from benchmarks.fakenode import FakeChain, FakeNodeServer
+from benchmarks.synthetic import make_chain
+from rpc import BatchRPC, decode_block
+
+
+def unpooled(url, numbers):
+    for n in numbers:
+        payload = {'jsonrpc': '2.0', 'id': n, 'method': 'eth_getBlockByNumber', 'params': [hex(n), True]}
+        decode_block(requests.post(url, json=payload, headers={'Connection': 'close'}).json()['result'])
+
+
+def pooled(url, numbers):
+    rpc = BatchRPC(url)
+    for n in numbers:
+        rpc.get_block(n)
+    return rpc
+
+
+def batched(url, numbers, size=20):
+    rpc = BatchRPC(url)
+    for i in range(0, len(numbers), size):
+        rpc.get_blocks(numbers[i:i + size])
+    return rpc
+
+
+def main(n_blocks=200, latency_ms=2):
+    blocks = make_chain(8939000, n_blocks, n_tx=200)
+    numbers = [block['number'] for block in blocks]
+    with FakeNodeServer(FakeChain(blocks, latency_ms / 1e3)) as node:
+        print('%d blocks, %d ms server latency per request' % (n_blocks, latency_ms))
+        for name, fetch in (('new connection per call', unpooled),
+                            ('pooled keep-alive', pooled),
+                            ('batched x20', batched)):
+            start = time.perf_counter()
+            rpc = fetch(node.url, numbers)
+            elapsed = time.perf_counter() - start
+            line = '%-24s %7.2f s  %7.1f blocks/s' % (name, elapsed, n_blocks / elapsed)
+            if rpc is not None:
+                for method, (count, mean, p50, p99) in rpc.latency_summary().items():
+                    line += '   %s: %d req, p50 %.1f ms, p99 %.1f ms' % (method, count, p50 * 1e3, p99 * 1e3)
+            print(line)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
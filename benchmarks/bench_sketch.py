@@ -0,0 +1,106 @@
+"""
+accuracy and cost of PriceSketch against the exact pandas computation on a
+synthetic chain: quantiles of every accepted gas price over a sliding
+window of per block sketches, and the hashpower recs read off the sketch of
+block min gas prices against exact ones from analyze_last200blocks and the
+predictTable grid recs
+
+run from the repo root:  python -m benchmarks.bench_sketch [blocks] [tx_per_block]
+"""
+import sys
+import time
+
+import numpy as np
+
+import gasExpress
+from benchmarks.synthetic import make_chain
+from blockring import BlockRing
+from hashpower import HashpowerWindow
+from sketch import PriceSketch
+
+QUANTILES = [0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99]
+TIERS = ['safeLow', 'standard', 'fast', 'fastest']
+
+
+def exact_quantile(values, q):
+    """smallest value with at least q of the values at or below it"""
+    values = values.sort_values().to_numpy()
+    return values[np.maximum(np.ceil(np.asarray(q) * len(values)).astype(int), 1) - 1]
+
+
+def exact_recs(hashpower):
+    """each tier's exact price (gwei) from the analyze_last200blocks hashpower table, no grid"""
+    shares = np.sqrt(np.array([gasExpress.SAFELOW, gasExpress.STANDARD, gasExpress.FAST, 100]) / 100) * 100
+    prices = [hashpower.index[hashpower['hashp_pct'] >= share - 1e-9].min() for share in shares]
+    return dict(zip(TIERS, np.array(prices) / 10))
+
+
+def relative_error(got, exact):
+    got, exact = np.asarray(got, dtype=np.float64), np.asarray(exact, dtype=np.float64)
+    return np.abs(got - exact) / np.maximum(exact, 1e-9)
+
+
+def main(n_blocks=600, n_tx=200):
+    chain = make_chain(8939000, n_blocks, n_tx=n_tx)
+    history = BlockRing(gasExpress.HISTORY_BLOCKS)
+    window = HashpowerWindow(200, gasExpress.SKETCH_ALPHA)
+    accepted = PriceSketch(gasExpress.SKETCH_ALPHA)
+    block_sketches = {}
+    quantile_errors, sketch_errors, grid_errors = [], [], []
+    t_exact = t_sketch = t_grid = 0.0
+    for block_obj in chain:
+        block_df = gasExpress.block_to_dataframe(block_obj)
+        block_sumdf = gasExpress.process_block_data(block_df, block_obj)
+        history.append(block_df, block_sumdf)
+        window.add_block(block_sumdf)
+        number = block_obj['number']
+        block = number + 3
+
+        # accepted prices: a sketch per block, merged into the window and subtracted as it leaves
+        start = time.perf_counter()
+        block_sketches[number] = PriceSketch(gasExpress.SKETCH_ALPHA).add(block_df['round_gp_10gwei'].to_numpy())
+        accepted += block_sketches[number]
+        evicted = block_sketches.pop(number - gasExpress.HISTORY_BLOCKS, None)
+        if evicted is not None:
+            accepted -= evicted
+        got = accepted.quantile(QUANTILES)
+        t_sketch += time.perf_counter() - start
+        start = time.perf_counter()
+        expected = exact_quantile(history.alltx()['round_gp_10gwei'], QUANTILES)
+        t_exact += time.perf_counter() - start
+        quantile_errors.append(relative_error(got, expected))
+
+        # recs
+        (hashpower, block_time) = window.analyze(block)
+        expected = exact_recs(gasExpress.analyze_last200blocks(block, history.blockdata())[0])
+        start = time.perf_counter()
+        sketch_recs = gasExpress.get_sketch_recs(window.sketch, block_time, block)
+        t_sketch += time.perf_counter() - start
+        start = time.perf_counter()
+        grid_recs = gasExpress.get_gasprice_recs(gasExpress.make_predictTable(block, history.alltx(), hashpower, block_time),
+                                                  block_time, block)
+        t_grid += time.perf_counter() - start
+        for tier in TIERS:
+            # the upper bucket bound never undercuts the exact price
+            assert sketch_recs[tier] >= expected[tier] - 1e-9, (block, tier, sketch_recs[tier], expected[tier])
+        sketch_errors.append(relative_error([sketch_recs[t] for t in TIERS], [expected[t] for t in TIERS]))
+        grid_errors.append(relative_error([grid_recs[t] for t in TIERS], [expected[t] for t in TIERS]))
+
+    n = len(chain)
+    alltx = history.alltx()
+    print("%d blocks of ~%d txs, alpha %.3f, window of %d blocks" % (n, n_tx, gasExpress.SKETCH_ALPHA, gasExpress.HISTORY_BLOCKS))
+    print("state         sketch %d bytes   window rows %d bytes" % (accepted.nbytes, alltx['round_gp_10gwei'].nbytes))
+    errors = np.max(quantile_errors, axis=0)
+    print("accepted price quantiles, max relative error over all blocks:")
+    for (q, error) in zip(QUANTILES, errors):
+        print("  q %.2f  %.4f" % (q, error))
+    assert errors.max() <= gasExpress.SKETCH_ALPHA + 1e-9
+    print("recs vs exact prices, max relative error over all blocks:")
+    for (tier, sketch_error, grid_error) in zip(TIERS, np.max(sketch_errors, axis=0), np.max(grid_errors, axis=0)):
+        print("  %-9s sketch %.4f   grid %.4f" % (tier, sketch_error, grid_error))
+    print("time/block    sketch %.3f ms   pandas quantiles %.3f ms   grid recs %.3f ms"
+          % (t_sketch / n * 1e3, t_exact / n * 1e3, t_grid / n * 1e3))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
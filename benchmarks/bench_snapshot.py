@@ -0,0 +1,113 @@
+"""
+publishing the oracle's outputs every millisecond, far more often than
+once a block, while another process reads them: the previous in-place json
+rewrites, write-then-rename json, and the memory mapped seqlock snapshot.
+counts reads that fail to parse and reads whose recs and table come from
+different blocks, and reports the reader's cost per read
+
+run from the repo root:  python -m benchmarks.bench_snapshot [seconds]
+"""
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import gasExpress
+from snapshot import SnapshotReader, SnapshotWriter
+
+GASPRICES = np.concatenate([np.arange(0, 10, 1), np.arange(10, 1010, 10)])
+
+
+def block_outputs(block):
+    """recs and prediction table for a block, every value tagged with the block so mixed reads show"""
+    tag = block % 1000
+    gprecs = {'safeLow': tag, 'standard': tag, 'fast': tag, 'fastest': tag, 'block_time': 15, 'blockNum': block}
+    prediction_table = pd.DataFrame({'gasprice': GASPRICES, 'hashpower_accepting': np.full(len(GASPRICES), float(tag))})
+    return gprecs, prediction_table
+
+
+def write_in_place(directory, gprecs, prediction_table):
+    """the previous write_to_json: truncate and rewrite each file"""
+    with open(os.path.join(directory, 'predictions', 'API.json'), 'w') as outfile:
+        json.dump(gprecs, outfile)
+    with open(os.path.join(directory, 'predictTable.json'), 'w') as outfile:
+        outfile.write(prediction_table.assign(gasprice=prediction_table['gasprice']/10).to_json(orient='records'))
+
+
+def write_renamed(directory, gprecs, prediction_table):
+    cwd = os.getcwd()
+    os.chdir(directory)
+    try:
+        gasExpress.write_to_json(gprecs, prediction_table, None)
+    finally:
+        os.chdir(cwd)
+
+
+def read_json(directory):
+    with open(os.path.join(directory, 'predictions', 'API.json')) as f:
+        gprecs = json.load(f)
+    with open(os.path.join(directory, 'predictTable.json')) as f:
+        table = json.load(f)
+    return gprecs, [row['hashpower_accepting'] for row in table]
+
+
+def writer(method, directory, stop):
+    snapshot = SnapshotWriter(os.path.join(directory, 'oracle.snapshot')) if method == 'snapshot' else None
+    block = 9000000
+    while not stop.is_set():
+        gprecs, prediction_table = block_outputs(block)
+        if method == 'in place':
+            write_in_place(directory, gprecs, prediction_table)
+        elif method == 'rename':
+            write_renamed(directory, gprecs, prediction_table)
+        else:
+            snapshot.publish(gprecs, prediction_table)
+        block += 1
+        time.sleep(0.001)
+
+
+def reader(method, directory, seconds):
+    """(reads, unparseable reads, mixed reads, seconds per read)"""
+    snapshot = SnapshotReader(os.path.join(directory, 'oracle.snapshot'))
+    reads = unparseable = mixed = 0
+    deadline = time.perf_counter() + seconds
+    start = time.perf_counter()
+    while time.perf_counter() < deadline:
+        reads += 1
+        if method == 'snapshot':
+            _, gprecs, table = snapshot.read()
+            hpa = table['hashpower_accepting'].to_numpy()
+        else:
+            try:
+                gprecs, hpa = read_json(directory)
+            except (OSError, ValueError):
+                unparseable += 1
+                continue
+        if np.any(np.asarray(hpa) != gprecs['safeLow']):
+            mixed += 1
+    return reads, unparseable, mixed, (time.perf_counter() - start) / reads
+
+
+def main(seconds=3):
+    for method in ('in place', 'rename', 'snapshot'):
+        with tempfile.TemporaryDirectory() as directory:
+            os.makedirs(os.path.join(directory, 'predictions'))
+            write_renamed(directory, *block_outputs(8999999))
+            SnapshotWriter(os.path.join(directory, 'oracle.snapshot')).publish(*block_outputs(8999999))
+            stop = multiprocessing.Event()
+            process = multiprocessing.Process(target=writer, args=(method, directory, stop))
+            process.start()
+            reads, unparseable, mixed, per_read = reader(method, directory, seconds)
+            stop.set()
+            process.join()
+        print('%-9s %8d reads  %6d unparseable  %6d mixed blocks  %8.1f us per read'
+              % (method, reads, unparseable, mixed, per_read * 1e6))
+
+
+if __name__ == '__main__':
+    main(*[float(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,72 @@
+"""
+cold start: seconds to import the oracle, the model module and the
+dashboard in a fresh interpreter, which heavy dependencies each one pulls
+in, and what the deferred sklearn import adds to the first model fit.
+"gasExpress + sklearn" imports sklearn's estimators up front as the oracle
+used to; "first fit" times only the first ModelManager.update after import.
+
+run from the repo root:  python -m benchmarks.bench_startup [runs]
+"""
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+HEAVY = ['sklearn', 'scipy', 'pandas', 'dash', 'asyncio']
+
+CASES = [('gasExpress', 'import gasExpress'),
+         ('gasExpress + sklearn', 'import gasExpress, sklearn.pipeline, sklearn.decomposition, sklearn.ensemble, '
+                                  'sklearn.linear_model, sklearn.model_selection, sklearn.preprocessing'),
+         ('models', 'import models'),
+         ('replay', 'import replay'),
+         ('app', 'import app'),
+         ('first fit', 'import gasExpress\n'
+                       'from benchmarks.synthetic import make_chain\n'
+                       'from blockring import BlockRing\n'
+                       'from hashpower import HashpowerWindow\n'
+                       'from models import ModelManager\n'
+                       'history, last200 = BlockRing(200), HashpowerWindow(200)\n'
+                       'for block_obj in make_chain(8939000, 50, n_tx=50):\n'
+                       '    block_df = gasExpress.block_to_dataframe(block_obj)\n'
+                       '    block_sumdf = gasExpress.process_block_data(block_df, block_obj)\n'
+                       '    history.append(block_df, block_sumdf)\n'
+                       '    last200.add_block(block_sumdf)\n'
+                       'alltx = history.alltx()\n'
+                       'gasExpress.make_predictTable(8939053, alltx, last200.analyze(8939053)[0], 15)\n'
+                       'start = time.perf_counter()\n'
+                       'ModelManager("always", n_estimators=10).update(alltx, 8939053)\n')]
+
+TIMED = '''
+import json, sys, time, warnings
+warnings.simplefilter('ignore')
+start = time.perf_counter()
+%s
+elapsed = time.perf_counter() - start
+print(json.dumps([elapsed, [name for name in %r if name in sys.modules]]))
+'''
+
+
+def run(code):
+    """(seconds, heavy modules loaded) in a fresh interpreter, None if it fails here"""
+    result = subprocess.run([sys.executable, '-c', TIMED % (code, HEAVY)], capture_output=True, text=True,
+                            env=dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [os.getcwd(), os.environ.get('PYTHONPATH')]))))
+    if result.returncode != 0:
+        return None
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main(runs=5):
+    print("%-22s %10s %10s   %s" % ('', 'median s', 'min s', 'loaded'))
+    for (name, code) in CASES:
+        results = [run(code) for _ in range(runs)]
+        if None in results:
+            print("%-22s %10s" % (name, 'failed (missing dependency?)'))
+            continue
+        times = np.array([elapsed for (elapsed, _) in results])
+        print("%-22s %10.3f %10.3f   %s" % (name, np.median(times), times.min(), ', '.join(results[-1][1])))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,66 @@
+"""
+startup and per-block disk cost with and without the block store:
+bytes written per block (the old alltx.csv dump vs store records) and
+time to load the startup window from a fake node vs from the store
+
+run from the repo root:  python -m benchmarks.bench_store [latency_ms]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import gasExpress
+from backfill import Backfill
+from benchmarks.fakenode import FakeChain, FakeNodeServer
+from benchmarks.synthetic import make_chain
+from blockring import BlockRing
+from blockstore import BlockStore
+from rpc import BatchRPC
+
+
+def main(latency_ms=50):
+    n = gasExpress.BACKFILL_BLOCKS
+    blocks = make_chain(8939000, n, n_tx=200)
+    start, stop = blocks[0]['number'], blocks[-1]['number'] + 1
+
+    with tempfile.TemporaryDirectory() as path:
+        store = BlockStore(path)
+        history = BlockRing(gasExpress.HISTORY_BLOCKS)
+        csv_bytes = 0
+        for block_obj in blocks:
+            block_df = gasExpress.block_to_dataframe(block_obj)
+            block_sumdf = gasExpress.process_block_data(block_df, block_obj)
+            history.append(block_df, block_sumdf)
+            store.append(block_df, block_sumdf)
+            # what make_predictTable used to write every block
+            alltx = history.alltx()
+            csv_bytes += len(alltx[alltx.block_mined > (alltx.block_mined.max()-50)].to_csv().encode())
+        print('bytes written per block: alltx.csv %d, block store %d'
+              % (csv_bytes / n, store.bytes_written / n))
+
+        with FakeNodeServer(FakeChain(blocks, latency_ms / 1e3)) as node:
+            gasExpress.rpc = BatchRPC(node.url)
+            backfill = Backfill(gasExpress.process_blocks_transactions,
+                                gasExpress.BACKFILL_CONCURRENCY, gasExpress.BACKFILL_BATCH)
+            begin = time.perf_counter()
+            cold = BlockRing(gasExpress.HISTORY_BLOCKS)
+            for (block_df, block_obj) in backfill.blocks(start, stop):
+                cold.append(block_df, gasExpress.process_block_data(block_df, block_obj))
+            t_cold = time.perf_counter() - begin
+            backfill.shutdown()
+
+        begin = time.perf_counter()
+        warm = BlockRing(gasExpress.HISTORY_BLOCKS)
+        for (block_df, block_sumdf) in BlockStore(path).blocks(start, stop):
+            warm.append(block_df, block_sumdf)
+        t_warm = time.perf_counter() - begin
+        assert (warm.alltx().index == cold.alltx().index).all()
+        assert (warm.alltx().values == cold.alltx().values).all()
+        print('startup load of %d blocks: node (%d ms/request) %.2f s, store %.2f s'
+              % (n, latency_ms, t_cold, t_warm))
+        print('store size on disk %d bytes' % sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path)))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,63 @@
+"""
+per transaction price queries: running the model for each request vs a
+GasSurface precomputed once per block, with the surface's answers checked
+against a brute force scan of its grid
+
+run from the repo root:  python -m benchmarks.bench_surface [queries]
+"""
+import sys
+import time
+
+import numpy as np
+
+import gasExpress
+from benchmarks.bench_predictions import trained_model
+from surface import GasSurface
+
+
+def per_request(model, gas, blocks):
+    """the model evaluated for this one gas limit over the price grid"""
+    (gasprices, row) = gasExpress.ml_predictions(model, gasExpress.SURFACE_GASPRICES, gas)
+    ok = np.minimum.accumulate(row) <= blocks
+    return gasprices[ok.argmax()] if ok.any() else np.nan
+
+
+def main(queries=2000):
+    model = trained_model()
+    rng = np.random.RandomState(0)
+    gas = rng.choice(gasExpress.SURFACE_GAS, queries) * rng.uniform(0.8, 1.25, queries)
+    blocks = rng.choice([1, 2, 4, 8, 20, 60, 120], queries)
+
+    start = time.perf_counter()
+    (gasprices, grid) = gasExpress.ml_predictions(model, gasExpress.SURFACE_GASPRICES, gasExpress.SURFACE_GAS)
+    surface = GasSurface(gasExpress.SURFACE_GAS, gasprices, grid)
+    t_build = time.perf_counter() - start
+    print('surface %d gas limits x %d prices, %d bytes, built in %.1f ms'
+          % (len(surface.gas_limits), len(surface.gasprices), surface.nbytes, t_build * 1e3))
+
+    start = time.perf_counter()
+    answers = [surface.cheapest(g, b) for g, b in zip(gas, blocks)]
+    t_surface = (time.perf_counter() - start) / queries
+
+    n_model = min(queries, 100)
+    start = time.perf_counter()
+    for g, b in zip(gas[:n_model], blocks[:n_model]):
+        per_request(model, g, b)
+    t_model = (time.perf_counter() - start) / n_model
+    print('model per request   %10.1f us per query' % (t_model * 1e6))
+    print('surface lookup      %10.1f us per query' % (t_surface * 1e6))
+
+    # at a bucket's gas limit the answer lies between the grid price before the first one
+    # meeting the wait and that one
+    step = gasprices[1] - gasprices[0]
+    for g in gasExpress.SURFACE_GAS:
+        for b in [1, 2, 4, 8, 20, 60, 120]:
+            price = surface.cheapest(g, b)
+            scanned = per_request(model, g, b)
+            assert (np.isnan(price) and np.isnan(scanned)) or scanned - step - 1e-4 <= price <= scanned + 1e-4, (g, b, price, scanned)
+    answered = np.isfinite(answers).mean()
+    print('answers checked against a grid scan; %.0f%% of random queries have a price' % (answered * 100))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,286 @@
+"""local stand-in for an ethereum json-rpc node, serving canned blocks"""
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import websockets
+
+
+def encode_tx(tx, pending=False):
+    """synthetic tx dict -> the hex json a node returns, with no blockNumber while pending"""
+    return {'hash': '0x' + tx['hash'].hex(),
+            'blockNumber': None if pending else hex(tx['blockNumber']),
+            'gasPrice': hex(tx['gasPrice']),
+            'gas': hex(tx['gas'])}
+
+
+def encode_block(block):
+    """synthetic block dict -> the hex json a node returns for eth_getBlockByNumber(n, True)"""
+    transactions = [encode_tx(tx) for tx in block['transactions']]
+    return {'number': hex(block['number']),
+            'hash': '0x' + block['hash'].hex(),
+            'timestamp': hex(block['timestamp']),
+            'transactions': transactions}
+
+
+class FakeChain():
+    """
+    canned blocks, a movable head and a mempool of txs sent with
+    send_pending; answers json-rpc request objects.  the next `failures`
+    http requests are answered with a 503 instead.  `fetched` lists the
+    block numbers asked for, in order.
+    """
+    def __init__(self, blocks, latency=0.0):
+        self.blocks = {block['number']: encode_block(block) for block in blocks}
+        self.latency = latency
+        self.head = max(self.blocks) + 1
+        self.requests = 0
+        self.calls = 0
+        self.listeners = []
+        self.pending = {}
+        self.filters = {}
+        self.pending_listeners = []
+        self.failures = 0
+        self.fetched = []
+        self.lock = threading.Lock()
+
+    def send_pending(self, txs):
+        """put synthetic txs in the mempool and announce their hashes to filters and subscribers"""
+        encoded = [encode_tx(tx, pending=True) for tx in txs]
+        with self.lock:
+            for tx in encoded:
+                self.pending[tx['hash']] = tx
+            for changes in self.filters.values():
+                changes.extend(tx['hash'] for tx in encoded)
+        for listener in self.pending_listeners:
+            listener([tx['hash'] for tx in encoded])
+
+    def advance(self):
+        """mine the next block: move the head and tell subscribers"""
+        self.head += 1
+        for listener in self.listeners:
+            listener(self.head)
+
+    def answer(self, request):
+        self.calls += 1
+        method, params = request['method'], request.get('params', [])
+        if method == 'eth_blockNumber':
+            result = hex(self.head)
+        elif method == 'eth_getBlockByNumber':
+            self.fetched.append(int(params[0], 16))
+            result = self.blocks.get(int(params[0], 16))
+            if result is not None and len(params) > 1 and not params[1]:
+                result = dict(result, transactions=[tx['hash'] for tx in result['transactions']])
+        elif method == 'eth_getTransactionByHash':
+            result = self.pending.get(params[0])
+        elif method == 'eth_newPendingTransactionFilter':
+            with self.lock:
+                result = hex(len(self.filters) + 1)
+                self.filters[result] = []
+        elif method == 'eth_getFilterChanges':
+            with self.lock:
+                if params[0] not in self.filters:
+                    return {'jsonrpc': '2.0', 'id': request['id'], 'error': {'code': -32000, 'message': 'filter not found'}}
+                (result, self.filters[params[0]]) = (self.filters[params[0]], [])
+        else:
+            return {'jsonrpc': '2.0', 'id': request['id'], 'error': {'code': -32601, 'message': 'method not found'}}
+        return {'jsonrpc': '2.0', 'id': request['id'], 'result': result}
+
+    def failing(self):
+        """whether this http request should fail, counting down `failures`"""
+        with self.lock:
+            if self.failures <= 0:
+                return False
+            self.failures -= 1
+            return True
+
+    def handle(self, payload):
+        """one http request worth of json-rpc, single or batch"""
+        self.requests += 1
+        time.sleep(self.latency)
+        if isinstance(payload, list):
+            return [self.answer(request) for request in payload]
+        return self.answer(payload)
+
+
+class FakeNodeServer():
+    """
+    json-rpc over http on localhost for a FakeChain, keep-alive capable.
+
+        with FakeNodeServer(chain) as node:
+            rpc = BatchRPC(node.url)
+    """
+    def __init__(self, chain):
+        self.chain = chain
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # one buffered write per response, no nagle stalls on keep-alive
+            wbufsize = -1
+            disable_nagle_algorithm = True
+
+            def do_POST(handler):
+                length = int(handler.headers['Content-Length'])
+                payload = json.loads(handler.rfile.read(length))
+                if chain.failing():
+                    handler.send_response(503)
+                    handler.send_header('Content-Length', '0')
+                    handler.end_headers()
+                    return
+                body = json.dumps(chain.handle(payload)).encode()
+                handler.send_response(200)
+                handler.send_header('Content-Type', 'application/json')
+                handler.send_header('Content-Length', str(len(body)))
+                handler.end_headers()
+                handler.wfile.write(body)
+
+            def log_message(handler, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = 'http://127.0.0.1:%d' % self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class FakeFeedServer():
+    """
+    stand-in for a json http feed such as ethgasstation's: GET returns `body`
+    as json after `latency` seconds, or `status` with no body when it is not 200.
+
+        with FakeFeedServer({'safeLow': 10}) as feed:
+            cache = FeedCache(feed.url)
+    """
+    def __init__(self, body, latency=0.0, status=200):
+        self.body = body
+        self.latency = latency
+        self.status = status
+        self.requests = 0
+        feed = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            wbufsize = -1
+            disable_nagle_algorithm = True
+
+            def do_GET(handler):
+                feed.requests += 1
+                time.sleep(feed.latency)
+                body = json.dumps(feed.body).encode() if feed.status == 200 else b''
+                handler.send_response(feed.status)
+                handler.send_header('Content-Type', 'application/json')
+                handler.send_header('Content-Length', str(len(body)))
+                handler.end_headers()
+                handler.wfile.write(body)
+
+            def log_message(handler, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = 'http://127.0.0.1:%d/json/ethgasAPI.json' % self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class FakeWSNode():
+    """
+    eth_subscribe('newHeads') and ('newPendingTransactions') over websocket on
+    localhost for a FakeChain; other json-rpc calls are answered from the chain.
+
+        with FakeWSNode(chain) as node:
+            heads = HeadSource(rpc, node.url)
+            chain.advance()
+    """
+    def __init__(self, chain):
+        self.chain = chain
+        self.clients = set()
+        self.pending_clients = set()
+        self.loop = asyncio.new_event_loop()
+        self.ready = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        chain.listeners.append(self.publish)
+        chain.pending_listeners.append(self.publish_pending)
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+
+        async def start():
+            return await websockets.serve(self._handler, '127.0.0.1', 0)
+        self.server = self.loop.run_until_complete(start())
+        self.url = 'ws://127.0.0.1:%d' % self.server.sockets[0].getsockname()[1]
+        self.ready.set()
+        self.loop.run_forever()
+
+    async def _handler(self, ws, path=None):
+        try:
+            async for message in ws:
+                request = json.loads(message)
+                if request['method'] == 'eth_subscribe':
+                    pending = request['params'][0] == 'newPendingTransactions'
+                    (self.pending_clients if pending else self.clients).add(ws)
+                    await ws.send(json.dumps({'jsonrpc': '2.0', 'id': request['id'], 'result': '0x2' if pending else '0x1'}))
+                else:
+                    await ws.send(json.dumps(self.chain.answer(request)))
+        finally:
+            self.clients.discard(ws)
+            self.pending_clients.discard(ws)
+
+    async def _publish(self, number):
+        notification = json.dumps({'jsonrpc': '2.0', 'method': 'eth_subscription',
+                                   'params': {'subscription': '0x1', 'result': {'number': hex(number)}}})
+        for ws in list(self.clients):
+            try:
+                await ws.send(notification)
+            except websockets.ConnectionClosed:
+                self.clients.discard(ws)
+
+    def publish(self, number):
+        """push a newHeads notification to every subscriber, from any thread"""
+        asyncio.run_coroutine_threadsafe(self._publish(number), self.loop)
+
+    async def _publish_pending(self, hashes):
+        for ws in list(self.pending_clients):
+            try:
+                for tx_hash in hashes:
+                    await ws.send(json.dumps({'jsonrpc': '2.0', 'method': 'eth_subscription',
+                                              'params': {'subscription': '0x2', 'result': tx_hash}}))
+            except websockets.ConnectionClosed:
+                self.pending_clients.discard(ws)
+
+    def publish_pending(self, hashes):
+        """push newPendingTransactions notifications, one per hash, from any thread"""
+        asyncio.run_coroutine_threadsafe(self._publish_pending(hashes), self.loop)
+
+    def __enter__(self):
+        self.thread.start()
+        self.ready.wait()
+        return self
+
+    async def _close(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    def __exit__(self, *exc):
+        self.chain.listeners.remove(self.publish)
+        self.chain.pending_listeners.remove(self.publish_pending)
+        asyncio.run_coroutine_threadsafe(self._close(), self.loop).result(timeout=10)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
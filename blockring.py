@@ -0,0 +1,112 @@
+"""
+bounded, block indexed store for the oracle's transaction and block history
+"""
+import numpy as np
+import pandas as pd
+
+TX_COLUMNS = ['block_mined', 'gas_price', 'round_gp_10gwei', 'gas', 'time_mined']
+BLOCK_COLUMNS = ['block_number', 'time_mined', 'mingasprice']
+
+
+class BlockRing():
+    """
+    keeps the last `capacity` blocks (by block number) of transactions and
+    block summaries in contiguous numpy arrays.
+
+    rows are written at the head.  old blocks are evicted by moving the tail
+    offset, and the live rows are only moved back to the front of the buffer
+    when the head runs out of room, so the window is always one contiguous
+    slice.  frames returned by alltx/blockdata are views on the buffer and
+    are only valid until the next append.
+    """
+    def __init__(self, capacity=200, tx_per_block=300):
+        self.capacity = capacity
+        self.txs = np.empty((2 * capacity * tx_per_block, len(TX_COLUMNS)))
+        self.tx_hashes = np.empty(len(self.txs), dtype=object)
+        self.blocks = np.empty((2 * capacity, len(BLOCK_COLUMNS)))
+        self.block_hashes = np.empty(len(self.blocks), dtype=object)
+        # tx offset of each block slot; tx_start[hi] is the tx head
+        self.tx_start = np.zeros(len(self.blocks) + 1, dtype=np.int64)
+        self.lo = 0
+        self.hi = 0
+
+    def __len__(self):
+        return self.hi - self.lo
+
+    @property
+    def newest(self):
+        """newest block number held, None when empty"""
+        if self.hi == self.lo:
+            return None
+        return int(self.blocks[self.hi - 1, 0])
+
+    @property
+    def tx_count(self):
+        return int(self.tx_start[self.hi] - self.tx_start[self.lo])
+
+    def append(self, block_df, block_sumdf):
+        """
+        add a mined block (frames from block_to_dataframe / process_block_data).
+        blocks at or below the newest block held are ignored.
+        """
+        number = int(block_sumdf['block_number'].iloc[0])
+        if self.hi > self.lo and number <= self.newest:
+            return False
+        self.evict(number - self.capacity)
+        n = len(block_df)
+        if self.hi == len(self.blocks) or self.tx_start[self.hi] + n > len(self.txs):
+            self._compact(n)
+        slot = self.hi
+        start = self.tx_start[slot]
+        self.txs[start:start + n] = block_df[TX_COLUMNS].to_numpy(dtype=np.float64)
+        self.tx_hashes[start:start + n] = block_df.index.to_numpy()
+        self.blocks[slot] = block_sumdf[BLOCK_COLUMNS].to_numpy(dtype=np.float64)[0]
+        self.block_hashes[slot] = block_sumdf['blockhash'].iloc[0]
+        self.tx_start[slot + 1] = start + n
+        self.hi += 1
+        return True
+
+    def evict(self, block):
+        """drop every block numbered at or below `block`"""
+        held = self.blocks[self.lo:self.hi, 0]
+        self.lo += int(np.searchsorted(held, block, side='right'))
+
+    def _compact(self, incoming):
+        """move the live window to the front, growing the tx buffer if needed"""
+        tx_lo, tx_hi = self.tx_start[self.lo], self.tx_start[self.hi]
+        live = tx_hi - tx_lo
+        if live + incoming > len(self.txs) // 2:
+            size = 2 * (live + incoming)
+            txs = np.empty((size, len(TX_COLUMNS)))
+            tx_hashes = np.empty(size, dtype=object)
+            txs[:live] = self.txs[tx_lo:tx_hi]
+            tx_hashes[:live] = self.tx_hashes[tx_lo:tx_hi]
+            self.txs, self.tx_hashes = txs, tx_hashes
+        else:
+            self.txs[:live] = self.txs[tx_lo:tx_hi]
+            self.tx_hashes[:live] = self.tx_hashes[tx_lo:tx_hi]
+        k = self.hi - self.lo
+        self.blocks[:k] = self.blocks[self.lo:self.hi]
+        self.block_hashes[:k] = self.block_hashes[self.lo:self.hi]
+        self.tx_start[:k + 1] = self.tx_start[self.lo:self.hi + 1] - tx_lo
+        self.lo, self.hi = 0, k
+
+    def _first_slot(self, blocks):
+        if blocks is None or self.hi == self.lo:
+            return self.lo
+        held = self.blocks[self.lo:self.hi, 0]
+        return self.lo + int(np.searchsorted(held, self.newest - blocks, side='right'))
+
+    def alltx(self, blocks=None):
+        """transactions from the last `blocks` blocks (default all held), indexed by hash"""
+        first = self._first_slot(blocks)
+        start, end = self.tx_start[first], self.tx_start[self.hi]
+        return pd.DataFrame(self.txs[start:end], index=self.tx_hashes[start:end],
+                            columns=TX_COLUMNS, copy=False)
+
+    def blockdata(self, blocks=None):
+        """block summaries for the last `blocks` blocks (default all held)"""
+        first = self._first_slot(blocks)
+        blockdata = pd.DataFrame(self.blocks[first:self.hi], columns=BLOCK_COLUMNS, copy=False)
+        blockdata.insert(1, 'blockhash', self.block_hashes[first:self.hi])
+        return blockdata
@@ -0,0 +1,160 @@
+"""
+append-only on-disk store of mined blocks and their transactions, so
+restarts reload history instead of refetching it from the node
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+TX_DTYPE = np.dtype([('block_mined', '<i8'), ('gas_price', '<f8'), ('round_gp_10gwei', '<f8'),
+                     ('gas', '<i8'), ('time_mined', '<i8'), ('hash', 'V32')])
+BLOCK_DTYPE = np.dtype([('block_number', '<i8'), ('time_mined', '<i8'), ('mingasprice', '<f8'),
+                        ('tx_start', '<i8'), ('tx_count', '<i8'), ('blockhash', 'V32')])
+TX_COLUMNS = ['block_mined', 'gas_price', 'round_gp_10gwei', 'gas', 'time_mined']
+
+
+def _hashes(raw):
+    """V32 field -> object array of 32 byte hashes"""
+    buf = raw.tobytes()
+    hashes = np.empty(len(raw), dtype=object)
+    hashes[:] = [buf[i:i + 32] for i in range(0, len(buf), 32)]
+    return hashes
+
+
+class BlockStore():
+    """
+    blocks are kept in segments of `segment_blocks` block numbers, each a pair
+    of flat binary files of fixed size records: <first block>.txs and
+    <first block>.blocks.  a block's transactions are written before its block
+    record, so a torn write is cut back to the last complete block on open.
+    segments wholly older than `keep_blocks` behind the newest block are deleted.
+    a `readonly` store, e.g. one a running oracle is still writing, changes
+    nothing on disk: a missing directory is an empty store and a torn
+    record at the end is left alone and not read.
+    """
+    def __init__(self, path, segment_blocks=10000, keep_blocks=50000, readonly=False):
+        self.path = str(path)
+        self.segment_blocks = segment_blocks
+        self.keep_blocks = keep_blocks
+        self.readonly = readonly
+        self.bytes_written = 0
+        if not readonly:
+            os.makedirs(self.path, exist_ok=True)
+        names = os.listdir(self.path) if os.path.isdir(self.path) else []
+        self.segments = sorted(int(name.split('.')[0]) for name in names if name.endswith('.blocks'))
+        self.newest = None
+        if self.segments:
+            if readonly:
+                blocks = self._read(self.segments[-1])[0]
+                self.newest = int(blocks['block_number'][-1]) if len(blocks) else None
+            else:
+                self._repair(self.segments[-1])
+
+    def _files(self, segment):
+        return (os.path.join(self.path, '%010d.blocks' % segment),
+                os.path.join(self.path, '%010d.txs' % segment))
+
+    def _repair(self, segment):
+        blocks_file, txs_file = self._files(segment)
+        size = os.path.getsize(blocks_file)
+        if size % BLOCK_DTYPE.itemsize:
+            os.truncate(blocks_file, size - size % BLOCK_DTYPE.itemsize)
+        blocks = np.fromfile(blocks_file, BLOCK_DTYPE)
+        if len(blocks) == 0:
+            return
+        tx_end = int(blocks['tx_start'][-1] + blocks['tx_count'][-1])
+        if os.path.getsize(txs_file) > tx_end * TX_DTYPE.itemsize:
+            os.truncate(txs_file, tx_end * TX_DTYPE.itemsize)
+        self.newest = int(blocks['block_number'][-1])
+
+    def _read(self, segment):
+        """the segment's complete block and tx records"""
+        blocks_file, txs_file = self._files(segment)
+        blocks = np.fromfile(blocks_file, BLOCK_DTYPE, count=os.path.getsize(blocks_file) // BLOCK_DTYPE.itemsize)
+        count = os.path.getsize(txs_file) // TX_DTYPE.itemsize
+        if count == 0:
+            return blocks, np.empty(0, TX_DTYPE)
+        return blocks, np.memmap(txs_file, TX_DTYPE, mode='r', shape=(count,))
+
+    def append(self, block_df, block_sumdf):
+        """
+        write a mined block (frames from block_to_dataframe / process_block_data).
+        blocks at or below the newest stored block are skipped.
+        """
+        if self.readonly:
+            raise ValueError("block store %s is read only" % self.path)
+        number = int(block_sumdf['block_number'].iloc[0])
+        if self.newest is not None and number <= self.newest:
+            return False
+        segment = number - number % self.segment_blocks
+        blocks_file, txs_file = self._files(segment)
+        if segment not in self.segments:
+            for filename in (blocks_file, txs_file):
+                open(filename, 'wb').close()
+            self.segments.append(segment)
+            self.prune(number - self.keep_blocks)
+        tx_start = os.path.getsize(txs_file) // TX_DTYPE.itemsize
+
+        txs = np.empty(len(block_df), TX_DTYPE)
+        for column in TX_COLUMNS:
+            txs[column] = block_df[column].to_numpy()
+        txs['hash'] = np.frombuffer(b''.join(block_df.index), dtype='V32')
+        record = np.empty(1, BLOCK_DTYPE)
+        for column in ['block_number', 'time_mined', 'mingasprice']:
+            record[column] = block_sumdf[column].to_numpy(dtype=np.float64)
+        record['tx_start'] = tx_start
+        record['tx_count'] = len(block_df)
+        record['blockhash'] = np.frombuffer(bytes(block_sumdf['blockhash'].iloc[0]), dtype='V32')
+
+        with open(txs_file, 'ab') as f:
+            f.write(txs.tobytes())
+        with open(blocks_file, 'ab') as f:
+            f.write(record.tobytes())
+        self.bytes_written += txs.nbytes + record.nbytes
+        self.newest = number
+        return True
+
+    def prune(self, block):
+        """delete segments holding only blocks at or below `block`"""
+        if self.readonly:
+            raise ValueError("block store %s is read only" % self.path)
+        for segment in list(self.segments):
+            if segment + self.segment_blocks - 1 <= block:
+                for filename in self._files(segment):
+                    os.remove(filename)
+                self.segments.remove(segment)
+
+    def blocks(self, start, stop):
+        """yield (block_df, block_sumdf) for stored blocks numbered start <= n < stop, in order"""
+        for segment in self.segments:
+            if segment + self.segment_blocks <= start or segment >= stop:
+                continue
+            blocks, txs = self._read(segment)
+            lo, hi = np.searchsorted(blocks['block_number'], [start, stop])
+            for record in blocks[lo:hi]:
+                rows = txs[record['tx_start']:record['tx_start'] + record['tx_count']]
+                block_df = pd.DataFrame({column: np.array(rows[column]) for column in TX_COLUMNS},
+                                        index=_hashes(rows['hash']))
+                block_sumdf = pd.DataFrame({'block_number': [int(record['block_number'])],
+                                            'blockhash': [record['blockhash'].tobytes()],
+                                            'time_mined': [int(record['time_mined'])],
+                                            'mingasprice': [float(record['mingasprice'])]})
+                yield (block_df, block_sumdf)
+
+    def alltx(self, blocks=200):
+        """transactions of the newest `blocks` stored blocks as one frame indexed by hash"""
+        if self.newest is None:
+            return pd.DataFrame(columns=TX_COLUMNS)
+        start = self.newest - blocks + 1
+        parts = []
+        for segment in self.segments:
+            if segment + self.segment_blocks <= start:
+                continue
+            records, txs = self._read(segment)
+            first = np.searchsorted(records['block_number'], start)
+            if first < len(records):
+                # up to the last complete block, not txs whose block record isn't written yet
+                parts.append(txs[records['tx_start'][first]:records['tx_start'][-1] + records['tx_count'][-1]])
+        rows = np.concatenate(parts) if parts else np.empty(0, TX_DTYPE)
+        return pd.DataFrame({column: rows[column] for column in TX_COLUMNS}, index=_hashes(rows['hash']))
@@ -1,26 +1,59 @@
-import time
-import sys
 import json
 import math
 import traceback
 import os
+import asyncio
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
 import pandas as pd
 import numpy as np
 
-import asyncio
-import threading
+from backfill import Backfill
+from blockring import BlockRing
+from blockstore import BlockStore
+from gasapi import GasAPI, finite_json
+from hashpower import HashpowerWindow
+from heads import HeadSource
+from mempool import PendingFeed, PendingPool
+from metrics import Metrics
+from models import FEATURES, ModelManager, TrainingWorker
+from profiling import BlockProfiler
+from rpc import BatchRPC
+from snapshot import SnapshotWriter
+from surface import GasSurface
 
-from sklearn.pipeline import FeatureUnion, Pipeline
-from sklearn.decomposition import PCA, TruncatedSVD
-from sklearn.ensemble import GradientBoostingRegressor
-from sklearn.model_selection import train_test_split
+###update name to adaptive gas pricing 
 
+RPC_URL = 'https://mainnet.infura.io/v3/6ed831aea5e4492097496271e02a95f0'
 
-from web3 import Web3, HTTPProvider
+rpc = BatchRPC(RPC_URL)
 
-###update name to adaptive gas pricing 
+### new blocks are pushed over this newHeads subscription (websocket url or ipc path), None polls the rpc node instead
+
+SUBSCRIBE_URL = 'wss://mainnet.infura.io/ws/v3/6ed831aea5e4492097496271e02a95f0'
+
+### networks run in this process, one Oracle each, sharing the api, training and fetch pools.  a network's config overrides
+### the module settings for it: rpc_url, subscribe_url, safelow, standard, fast, history_blocks, hashpower_blocks,
+### backfill_blocks, model_policy, model_candidates and pending_txs, e.g. 'goerli': {'rpc_url': ..., 'subscribe_url': ..., 'safelow': 20}.
+### every network but the first needs its own rpc_url, and polls for new blocks unless it has a subscribe_url.
+### the first network is served at /gas etc and written to the usual files, the others at /<name>/gas and under
+### ./data/<name> and ./predictions/<name>
+
+NETWORKS = {'mainnet': {}}
+
+### seconds before an oracle that failed (e.g. its node was down at startup) is started again; the other networks carry on
+
+ORACLE_RESTART = 30
+
+### pending txs are followed over the same subscription (or a pending tx filter when polling) so each tier's rec is at
+### least the price whose pending demand clears in its ML_TIER_BLOCKS blocks of BLOCK_GAS_LIMIT gas.  the pool holds up to
+### PENDING_CAPACITY txs, each for at most PENDING_TTL seconds unless mined first
 
-web3 = Web3(HTTPProvider('https://mainnet.infura.io/v3/6ed831aea5e4492097496271e02a95f0'))
+PENDING_TXS = True
+PENDING_CAPACITY = 50000
+PENDING_TTL = 600
+BLOCK_GAS_LIMIT = 10000000
 
 ### These are the threholds used for % blocks accepting to define the recommended gas prices. can be edited here if desired
 
@@ -28,10 +61,93 @@ SAFELOW = 35
 STANDARD = 60
 FAST = 90
 
-union = FeatureUnion([("pca", PCA(n_components=1)),
-                      ("svd", TruncatedSVD(n_components=2))])
+### the hashpower recs are read off a quantile sketch of the window's block min gas prices, within SKETCH_ALPHA (relative)
+### of the exact prices, rather than off the predictTable grid (1 gwei steps above 1 gwei, capped at 100); False uses the grid
+
+SKETCH_RECS = True
+SKETCH_ALPHA = 0.01
+
+### the model recs are the cheapest gas prices expected to confirm within these many blocks (safelow, standard, fast, fastest),
+### looked up over a grid of gas prices in gwei for a tx of ML_GAS gas
+
+ML_TIER_BLOCKS = [120, 20, 8, 1]
+ML_GASPRICES = np.arange(0, 100, 1)
+ML_GAS = 21000
+
+### expected blocks to confirm are precomputed each block over these gas limits x gas prices (gwei) for per tx price queries
+
+SURFACE_GAS = [21000, 50000, 100000, 200000, 500000, 1000000, 2000000, 4000000, 8000000]
+SURFACE_GASPRICES = np.arange(0, 100, 0.5)
+
+### number of recent blocks of transactions / block summaries the oracle keeps in memory
+
+HISTORY_BLOCKS = 200
+
+### the recs are made for the block this many after the newest mined block in the window: on each new head the
+### blocks up to head-4 are in the window and the recs are updated for head-1
+
+RECS_AHEAD = 3
+
+### how the gas price model is retrained each block: 'always', 'warm', 'drift' or 'every' (see models.ModelManager)
+
+MODEL_POLICY = 'drift'
 
-pipe_all = Pipeline([('union', union), ('grad',GradientBoostingRegressor(n_estimators=300, learning_rate=1.0,max_depth=1, random_state=0))])
+### model families (see models.REGISTRY) fitted side by side on each refit, the best holdout score is promoted; candidates
+### are fitted cheapest first while their last cpu times fit in MODEL_BUDGET cpu seconds, so keep it under a block time
+
+MODEL_CANDIDATES = ['gradient_boosting', 'ridge', 'hist_gradient_boosting', 'quantile_p50']
+MODEL_BUDGET = 10
+
+### processes used to train the model in the background, 0 trains inline in the main loop
+
+TRAINING_WORKERS = 2
+
+### blocks loaded on startup, and how many blocks are fetched from the node at once when loading or catching up
+
+BACKFILL_BLOCKS = 100
+BACKFILL_CONCURRENCY = 8
+BACKFILL_BATCH = 10
+
+### mined blocks are kept on disk here so restarts only fetch what is missing; replay.py reads the same store
+
+STORE_PATH = './data/blockstore'
+
+### the recs and prediction table are served over http at /gas and /predictTable on this address, None turns the api off
+
+API_HOST = '127.0.0.1'
+API_PORT = 8000
+
+### the recs and prediction table are also published here for readers on this machine (see snapshot.SnapshotReader)
+
+SNAPSHOT_PATH = './predictions/oracle.snapshot'
+
+### per stage timings and counters, served in prometheus text format at /metrics on the api address
+
+metrics = Metrics()
+metrics.describe('squid_stage_seconds', 'histogram', 'time spent in each stage of ingesting a block and updating the recs')
+metrics.describe('squid_model_seconds', 'histogram', 'time the last model update spent scoring and fitting, in the training worker')
+metrics.describe('squid_rpc_seconds', 'summary', 'json-rpc round trip times over recent requests')
+metrics.describe('squid_blocks_updated_total', 'counter', 'blocks the recs were updated for')
+metrics.describe('squid_errors_total', 'counter', 'exceptions caught while updating')
+metrics.describe('squid_head_lag_blocks', 'gauge', 'blocks the oracle is behind the chain head')
+metrics.describe('squid_alltx_rows', 'gauge', 'transactions held in the history window')
+metrics.describe('squid_blockdata_rows', 'gauge', 'blocks held in the history window')
+metrics.describe('squid_model_refits_total', 'counter', 'full model refits')
+metrics.describe('squid_model_warm_fits_total', 'counter', 'warm started model fits')
+metrics.describe('squid_model_score', 'gauge', 'holdout score of the current model')
+metrics.describe('squid_model_current', 'gauge', '1 for the candidate model family currently promoted, 0 for the others')
+metrics.describe('squid_candidate_score', 'gauge', 'holdout score of each candidate model at its last fit')
+metrics.describe('squid_candidate_seconds', 'gauge', 'fit and predict wall seconds and cpu seconds of each candidate model at its last fit')
+metrics.describe('squid_pending_txs', 'gauge', 'pending transactions held in the mempool pool')
+metrics.describe('squid_pending_evicted_total', 'counter', 'pending transactions that left the pool, by reason')
+metrics.describe('squid_pending_overflow_total', 'counter', 'announced pending tx hashes dropped with the lookup queue full')
+
+### None, or profile block updates: 'cprofile' dumps pstats, 'sample' writes sampled stacks in folded format
+### (flamegraph.pl / speedscope), to PROFILE_PATH every PROFILE_EVERY blocks
+
+PROFILE = None
+PROFILE_PATH = './profile.out'
+PROFILE_EVERY = 100
 
 
 class Timers():
@@ -46,17 +162,24 @@ class Timers():
     def update_time(self, block):
         self.current_block = block
         self.process_block = self.process_block + 1
+
+    @property
+    def lag(self):
+        """blocks the oracle is behind the chain head"""
+        return self.current_block - self.process_block
     
 class CleanTx():
     """transaction object / methods for pandas"""
+    __slots__ = ('hash', 'block_mined', 'gas_price', 'gp_10gwei', 'gas')
+
     def __init__(self, tx_obj):
         # print(tx_obj)  The gas for a transaction can be added here
-        self.hash = tx_obj.hash
-        self.block_mined = tx_obj.blockNumber
+        self.hash = tx_obj['hash']
+        self.block_mined = tx_obj['blockNumber']
         self.gas_price = tx_obj['gasPrice']
         self.round_gp_10gwei()
         self.gas = tx_obj['gas']
-        
+
     def to_dataframe(self):
         data = {self.hash: {'block_mined':self.block_mined, 'gas_price':self.gas_price, 'round_gp_10gwei':self.gp_10gwei,'gas':self.gas}}
         return pd.DataFrame.from_dict(data, orient='index')
@@ -76,76 +199,114 @@ class CleanTx():
 
 class CleanBlock():
     """block object/methods for pandas"""
+    __slots__ = ('block_number', 'time_mined', 'blockhash', 'mingasprice')
+
     def __init__(self, block_obj, timemined, mingasprice=None):
-        self.block_number = block_obj.number 
-        self.time_mined = timemined 
-        self.blockhash = block_obj.hash
+        self.block_number = block_obj['number']
+        self.time_mined = timemined
+        self.blockhash = block_obj['hash']
         self.mingasprice = mingasprice
-    
+
     def to_dataframe(self):
         data = {0:{'block_number':self.block_number, 'blockhash':self.blockhash, 'time_mined':self.time_mined, 'mingasprice':self.mingasprice}}
         return pd.DataFrame.from_dict(data, orient='index')
 
-def write_to_json(gprecs, prediction_table,alltx):
-    """write json data"""
+def round_gp_10gwei(gas_price):
+    """array version of CleanTx.round_gp_10gwei, gas prices in wei"""
+    gp = np.asarray(gas_price, dtype=np.float64)/1e8
+    return np.where(gp >= 10, gp/10*10, np.where(gp >= 1, gp, 0))
+
+def block_to_dataframe(block_obj):
+    """build the transaction frame for a block in one pass over its transactions"""
+    transactions = block_obj['transactions']
+    n = len(transactions)
+    hashes = np.empty(n, dtype=object)
+    block_mined = np.empty(n, dtype=np.int64)
+    gas_price = np.empty(n, dtype=np.float64)
+    gas = np.empty(n, dtype=np.int64)
+    for i, tx in enumerate(transactions):
+        hashes[i] = tx['hash']
+        block_mined[i] = tx['blockNumber']
+        gas_price[i] = tx['gasPrice']
+        gas[i] = tx['gas']
+    block_df = pd.DataFrame({'block_mined': block_mined,
+                             'gas_price': gas_price,
+                             'round_gp_10gwei': round_gp_10gwei(gas_price),
+                             'gas': gas,
+                             'time_mined': np.full(n, block_obj['timestamp'], dtype=np.int64)},
+                            index=hashes)
+    return block_df
+
+def write_to_json(gprecs, prediction_table,alltx, directory=None):
+    """write json data, each file written aside then renamed over the old one"""
     try:
-        prediction_table['gasprice'] = prediction_table['gasprice']/10
-        prediction_tableout = prediction_table.to_json(orient='records')
+        prediction_tableout = prediction_table.assign(gasprice=prediction_table['gasprice']/10).to_json(orient='records')
         filepath_gprecs = './predictions/API.json'
         filepath_prediction_table = 'predictTable.json'
-        filepath_alltx_table = 'alltx.json'
-        
-        with open(filepath_gprecs, 'w') as outfile:
-            json.dump(gprecs,outfile)
+        if directory is not None:
+            filepath_gprecs = os.path.join(directory, 'API.json')
+            filepath_prediction_table = os.path.join(directory, 'predictTable.json')
 
-        with open(filepath_prediction_table, 'w') as outfile:
-            outfile.write(prediction_tableout)
+        for (filepath, contents) in ((filepath_gprecs, finite_json(gprecs)),
+                                     (filepath_prediction_table, prediction_tableout)):
+            with open(filepath + '.tmp', 'w') as outfile:
+                outfile.write(contents)
+            os.replace(filepath + '.tmp', filepath)
 
     except Exception as e:
         print(e)
 
-def process_block_transactions(block):
+def process_block_transactions(block, client=None):
     """get tx data from block"""
-    block_df = pd.DataFrame()
-    block_obj = web3.eth.getBlock(block, True)
-    for transaction in block_obj.transactions:
-        clean_tx = CleanTx(transaction)
-        block_df = block_df.append(clean_tx.to_dataframe(), ignore_index = False)
-    block_df['time_mined'] = block_obj.timestamp
+    block_obj = (client or rpc).get_block(block)
+    block_df = block_to_dataframe(block_obj)
     return(block_df, block_obj)
 
-def process_block_data(block_df, block_obj,alltx):
+def process_blocks_transactions(blocks, client=None):
+    """get tx data for several blocks fetched in one batch request"""
+    return [(block_to_dataframe(block_obj), block_obj) for block_obj in (client or rpc).get_blocks(blocks)]
+
+def process_block_data(block_df, block_obj, alltx=None):
     """process block to dataframe"""
-    if len(block_obj.transactions) > 0:
+    if len(block_obj['transactions']) > 0:
         block_mingasprice = block_df['round_gp_10gwei'].min()
     else:
         block_mingasprice = np.nan
-    timemined = block_df['time_mined'].min()
+    timemined = block_obj['timestamp']
     clean_block = CleanBlock(block_obj, timemined, block_mingasprice)
     return(clean_block.to_dataframe())
 
+def get_hpa_batch(gasprices, hashpower):
+    """
+    gets the hash power accepting each gas price in an array over last 200 blocks.
+    hashp_pct is cumulative over the sorted mingasprice index, so the hash power
+    accepting a price is the hashp_pct of the last mingasprice at or below it
+    """
+    gasprices = np.asarray(gasprices, dtype=np.float64)
+    mingasprices = hashpower.index.to_numpy(dtype=np.float64)
+    if len(mingasprices) == 0:
+        return np.full(gasprices.shape, np.nan)
+    hashp_pct = hashpower['hashp_pct'].to_numpy(dtype=np.float64)
+    idx = np.searchsorted(mingasprices, gasprices, side='right') - 1
+    hpa = np.where(idx >= 0, hashp_pct[np.maximum(idx, 0)], 0)
+    hpa = np.where(gasprices > mingasprices[-1], 100, hpa)
+    hpa = np.where(np.isnan(gasprices), np.nan, hpa)
+    return ((hpa/100) * (hpa/100))*100
+
 def get_hpa(gasprice, hashpower):
     """gets the hash power accpeting the gas price over last 200 blocks"""
-    # print(hashpower)
-    hpa = hashpower.loc[gasprice >= hashpower.index, 'hashp_pct']
-    if gasprice > hashpower.index.max():
-        hpa = 100
-    elif gasprice < hashpower.index.min():
-        hpa = 0
-    else:
-        hpa = hpa.max()
-    return ((hpa/100) * (hpa/100))*100
+    return get_hpa_batch([gasprice], hashpower)[0]
 
 def analyze_last200blocks(block, blockdata):
-    recent_blocks = blockdata.loc[blockdata['block_number'] > (block-200), ['mingasprice', 'block_number']]
+    recent_blocks = blockdata.loc[blockdata['block_number'] > (block-200), ['mingasprice', 'block_number', 'time_mined']]
     #create hashpower accepting dataframe based on mingasprice accepted in block
-    hashpower = recent_blocks.groupby('mingasprice').count()
+    hashpower = recent_blocks[['mingasprice', 'block_number']].groupby('mingasprice').count()
     hashpower = hashpower.rename(columns={'block_number': 'count'})
     hashpower['cum_blocks'] = hashpower['count'].cumsum()
     totalblocks = hashpower['count'].sum()
     hashpower['hashp_pct'] = hashpower['cum_blocks']/totalblocks*100
     #get avg blockinterval time
-    blockinterval = recent_blocks.sort_values('block_number').diff()
+    blockinterval = recent_blocks[['block_number', 'time_mined']].sort_values('block_number').diff()
     blockinterval.loc[blockinterval['block_number'] > 1, 'time_mined'] = np.nan
     blockinterval.loc[blockinterval['time_mined']< 0, 'time_mined'] = np.nan
     avg_timemined = blockinterval['time_mined'].mean()
@@ -156,31 +317,37 @@ def analyze_last200blocks(block, blockdata):
 def make_predictTable(block, alltx, hashpower, avg_timemined):
 
     #predictiontable
-    predictTable = pd.DataFrame({'gasprice' :  range(10, 1010, 10)})
-    ptable2 = pd.DataFrame({'gasprice' : range(0, 10, 1)})
-    predictTable = predictTable.append(ptable2).reset_index(drop=True)
-    predictTable = predictTable.sort_values('gasprice').reset_index(drop=True)
-    predictTable['hashpower_accepting'] = predictTable['gasprice'].apply(get_hpa, args=(hashpower,))
-    alltx['hashpower_accepting'] = alltx['round_gp_10gwei'].apply(get_hpa, args=(hashpower,))
-    alltx = alltx[alltx.block_mined > (alltx.block_mined.max()-50)]    
-    ####do ml stuff here
-    alltx.to_csv('alltx.csv')
+    gasprices = np.concatenate([np.arange(0, 10, 1), np.arange(10, 1010, 10)])
+    predictTable = pd.DataFrame({'gasprice' : gasprices})
+    predictTable['hashpower_accepting'] = get_hpa_batch(gasprices, hashpower)
+    alltx['hashpower_accepting'] = get_hpa_batch(alltx['round_gp_10gwei'].to_numpy(), hashpower)
     return(predictTable)
 
-def get_gasprice_recs(prediction_table, block_time, block):
-    
+def pending_floor(gprecs, pending):
+    """raise each tier's rec (gwei) to the cheapest price whose pending demand clears in its ML_TIER_BLOCKS blocks"""
+    if pending is None or not len(pending):
+        return gprecs
+    for (tier, blocks) in zip(['safeLow', 'standard', 'fast', 'fastest'], ML_TIER_BLOCKS):
+        floor = pending.cheapest_clearing(blocks * BLOCK_GAS_LIMIT) / 10
+        if not gprecs[tier] >= floor:
+            gprecs[tier] = float(floor)
+    return gprecs
+
+def get_gasprice_recs(prediction_table, block_time, block, pending=None, thresholds=None):
+    (safelow_hpa, standard_hpa, fast_hpa) = (SAFELOW, STANDARD, FAST) if thresholds is None else thresholds
+
     def get_safelow():
-        series = prediction_table.loc[prediction_table['hashpower_accepting'] >= SAFELOW, 'gasprice']
+        series = prediction_table.loc[prediction_table['hashpower_accepting'] >= safelow_hpa, 'gasprice']
         safelow = series.min()
         return float(safelow)
 
     def get_average():
-        series = prediction_table.loc[prediction_table['hashpower_accepting'] >= STANDARD, 'gasprice']
+        series = prediction_table.loc[prediction_table['hashpower_accepting'] >= standard_hpa, 'gasprice']
         average = series.min()
         return float(average)
 
     def get_fast():
-        series = prediction_table.loc[prediction_table['hashpower_accepting'] >= FAST, 'gasprice']
+        series = prediction_table.loc[prediction_table['hashpower_accepting'] >= fast_hpa, 'gasprice']
         fastest = series.min()
         return float(fastest)
 
@@ -196,61 +363,67 @@ def get_gasprice_recs(prediction_table, block_time, block):
     gprecs['fastest'] = get_fastest()/10
     gprecs['block_time'] = block_time
     gprecs['blockNum'] = block
-    return(gprecs)
-
-def ml_methods(alltx, block_time, block):
-    union = FeatureUnion([("pca", PCA(n_components=1)),
-                      ("svd", TruncatedSVD(n_components=2))])
-
-    pipe_all = Pipeline([('union', union), ('grad',GradientBoostingRegressor(n_estimators=300, learning_rate=1.0,max_depth=1, random_state=0))])
-    def train_model(alltx):
-        alltx['tx_cost'] = alltx.gas * alltx.round_gp_10gwei
-        X = alltx[['gas','round_gp_10gwei','tx_cost']]
-
-        # print(X.round_gp_10gwei)
-        y = alltx['hashpower_accepting']
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.33, random_state=42)
-        pipe_all.fit(X_train,y_train)
-        return (pipe_all, X_test, y_test)
-
-    def check_model(model, X_test, y_test):
-        # print(type(X_test))
-        return model.score(X_test, y_test)
-
-    def make_model_predictions(model):
-        df = pd.DataFrame(columns=['gas','round_gp_10gwei','tx_cost'])
-        for i in range(0, 1000,10):
-            df.loc[i] = [21000, i, i*21000]
-        X = df[['gas','round_gp_10gwei','tx_cost']]
-        results = model.predict(X)      
-        return results
-
-    def calc_expected_num_blocks(hpa):
-    
-        if hpa < 100:
-            prob =100 - hpa
-            
-            return math.log(0.05)/math.log(prob/100)
-            
-        return 1
+    return(pending_floor(gprecs, pending))
 
-    model, X_test, y_test = train_model(alltx)
-    score = check_model(model, X_test, y_test)
-    results = make_model_predictions(model)
+def get_sketch_recs(sketch, block_time, block, pending=None, thresholds=None):
+    """
+    get_gasprice_recs from a PriceSketch of block min gas prices instead of the
+    prediction table.  hashpower accepting is the squared share of blocks
+    accepting, so a tier at threshold t needs the sqrt(t/100) quantile; each
+    rec is the upper bound of that quantile's bucket, rounded up to 0.01 gwei
+    """
+    (safelow_hpa, standard_hpa, fast_hpa) = (SAFELOW, STANDARD, FAST) if thresholds is None else thresholds
+    prices = sketch.quantile(np.sqrt(np.array([safelow_hpa, standard_hpa, fast_hpa, 100]) / 100), upper=True)
+    (safelow, average, fast, fastest) = np.ceil(prices * 10) / 100
+    gprecs = {}
+    gprecs['safeLow'] = float(safelow)
+    gprecs['standard'] = float(average)
+    gprecs['fast'] = float(fast)
+    gprecs['fastest'] = float(fastest)
+    gprecs['block_time'] = block_time
+    gprecs['blockNum'] = block
+    return(pending_floor(gprecs, pending))
 
-    results = [(i,calc_expected_num_blocks(result)) for i, result in enumerate(results)]
+def expected_num_blocks(hpa):
+    """
+    blocks to wait for 95% confidence of being mined when hpa % of blocks
+    accept the price: 1 when all do, inf when none do
+    """
+    hpa = np.asarray(hpa, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        blocks = math.log(0.05) / np.log((100 - hpa) / 100)
+    blocks = np.where(hpa >= 100, 1, blocks)
+    return np.where(hpa <= 0, np.inf, blocks)
 
-    return results, score
+def ml_predictions(model, gasprices=None, gas=ML_GAS):
+    """
+    expected blocks to confirm a tx at each gas price (gwei) from a trained
+    model, as (gasprices, blocks).  the whole grid goes through the model in
+    one predict; with an array of gas limits blocks has a row per gas limit
+    """
+    gasprices = ML_GASPRICES if gasprices is None else np.asarray(gasprices, dtype=np.float64)
+    gas = np.asarray(gas, dtype=np.float64)
+    (gas_grid, gp_grid) = np.meshgrid(np.atleast_1d(gas), gasprices * 10, indexing='ij')
+    X = np.column_stack([gas_grid.ravel(), gp_grid.ravel(), (gas_grid * gp_grid).ravel()])
+    hpa = model.predict(pd.DataFrame(X, columns=FEATURES))
+    blocks = expected_num_blocks(hpa).reshape(gas_grid.shape)
+    return gasprices, (blocks[0] if gas.ndim == 0 else blocks)
+
+def ml_methods(alltx, block_time, block, models=None):
+    """train per the model policy (refit every call without a ModelManager) and predict"""
+    if models is None:
+        models = ModelManager('always')
+    model, score = models.update(alltx, block)
+    return ml_predictions(model), score
 
 def make_ml_predictions_table(results,block_time, block):
-    # print(results)
-    df = pd.DataFrame(results, columns=['gas_price', 'blocks'])
-    df = df.groupby(['blocks'], as_index=False).agg({'gas_price': 'min'}).sort_values('blocks',ascending = False)
-
-    safe = df[df['blocks'] < 120]['gas_price'].min() if df[df['blocks'] < 120]['gas_price'].min()!= 0 else 1
-    standard = df[df['blocks'] < 20]['gas_price'].min() if df[df['blocks'] < 20]['gas_price'].min()!= 0 else 1
-    fast = df[df['blocks'] < 8]['gas_price'].min() if df[df['blocks'] < 8]['gas_price'].min()!= 0 else 1
-    fastest = df[df['blocks'] < 1]['gas_price'].min() if df[df['blocks'] < 2]['gas_price'].min()!= 0 else 1
+    """recs from ml_predictions: the cheapest price expected to confirm within each tier's ML_TIER_BLOCKS"""
+    (gasprices, blocks) = results
+    meets = blocks < np.array(ML_TIER_BLOCKS)[:, None]
+    cheapest = np.min(np.where(meets, gasprices, np.inf), axis=1)
+    cheapest[np.isinf(cheapest)] = np.nan
+    cheapest[cheapest == 0] = 1
+    (safe, standard, fast, fastest) = cheapest
     gprecs = {}
     ###maybe make a plot with the output being the minimum value as a function of the cutoff.  
     #Could be more informative for the end user
@@ -264,87 +437,311 @@ def make_ml_predictions_table(results,block_time, block):
     return gprecs
 
 
-def master_control():
+def make_recs(alltx, last200, block, trainer=None, pending=None, thresholds=None):
+    """
+    recs and prediction table for a block from the history and hashpower
+    windows, as (gprecs, predictiondf, block_time): the hashpower recs (at
+    (safelow, standard, fast) `thresholds`, the module's by default), or the
+    model's once `trainer` has published one, floored by the `pending` pool's
+    demand when there is one
+    """
+    with metrics.stage('hashpower'):
+        (hashpower, block_time) = last200.analyze(block)
+    with metrics.stage('predict_table'):
+        predictiondf = make_predictTable(block, alltx, hashpower, block_time)
+    with metrics.stage('recs'):
+        if SKETCH_RECS:
+            gprecs = get_sketch_recs(last200.sketch, block_time, block, pending, thresholds)
+        else:
+            gprecs = get_gasprice_recs (predictiondf, block_time, block, pending, thresholds)
+    if trainer is not None:
+        #train in the background and predict with the latest published model
+        with metrics.stage('train'):
+            trainer.submit(alltx, block)
+        if trainer.model is not None:
+            with metrics.stage('ml_predict'):
+                gprecs = pending_floor(make_ml_predictions_table(ml_predictions(trainer.model), block_time, block), pending)
+    return (gprecs, predictiondf, block_time)
 
-    def init (block):
-        nonlocal alltx
-        nonlocal blockdata
-        print("\n\n**** ETH Gas Station Express Oracle ****")
-        print ("\nSafelow = " +str(SAFELOW)+ "% of blocks accepting.  Usually confirms in less than 30min.")
-        print ("Standard= " +str(STANDARD)+ "% of blocks accepting. Usually confirms in less than 1.5 min.")
-        print ("Fast = " +str(FAST)+ "% of blocks accepting.  Usually confirms in less than .5 minute")
+
+
+def network_config(config, default=True):
+    """
+    a NETWORKS entry with the module settings filled in for whatever it leaves
+    out.  RPC_URL and SUBSCRIBE_URL are the default network's node, so any
+    other network has to give its own rpc_url and polls unless it gives a
+    subscribe_url.
+    """
+    if not default and config.get('rpc_url') is None:
+        raise ValueError("network settings need an rpc_url for any network but the first")
+    settings = {'rpc_url': None,
+                'subscribe_url': SUBSCRIBE_URL if default else None,
+                'safelow': SAFELOW,
+                'standard': STANDARD,
+                'fast': FAST,
+                'history_blocks': HISTORY_BLOCKS,
+                'hashpower_blocks': 200,
+                'backfill_blocks': BACKFILL_BLOCKS,
+                'model_policy': MODEL_POLICY,
+                'model_candidates': MODEL_CANDIDATES,
+                'pending_txs': PENDING_TXS}
+    unknown = set(config) - set(settings)
+    if unknown:
+        raise ValueError("unknown network settings %s" % sorted(unknown))
+    settings.update(config)
+    return settings
+
+
+class Oracle():
+    """
+    the oracle for one network: its node, windows, model and outputs.  the
+    `default` network is served at /gas etc and written to the usual files,
+    any other under /<name> and ./data/<name>, ./predictions/<name>.  the
+    api, training process pool, fetch thread pool and profiler are passed
+    in so several networks can share them.  run() follows the chain from
+    an event loop shared with the other networks' oracles.
+    """
+    def __init__(self, name, rpc_url=None, subscribe_url=None, safelow=SAFELOW, standard=STANDARD, fast=FAST,
+                 history_blocks=HISTORY_BLOCKS, hashpower_blocks=200, backfill_blocks=BACKFILL_BLOCKS,
+                 model_policy=MODEL_POLICY, model_candidates=MODEL_CANDIDATES, pending_txs=PENDING_TXS, default=True, api=None,
+                 training_pool=None, fetch_pool=None, profiler=None):
+        self.name = name
+        self.default = default
+        self.thresholds = (safelow, standard, fast)
+        self.backfill_blocks = backfill_blocks
+        # None shares the module's client, for the default network's RPC_URL
+        self.rpc = rpc if rpc_url is None else BatchRPC(rpc_url)
+        self.history = BlockRing(history_blocks)
+        self.store = BlockStore(STORE_PATH if default else os.path.join('./data', name, 'blockstore'))
+        self.last200 = HashpowerWindow(hashpower_blocks, SKETCH_ALPHA)
+        self.trainer = TrainingWorker(ModelManager(model_policy, candidates=model_candidates, budget=MODEL_BUDGET),
+                                      TRAINING_WORKERS, training_pool)
+        self.backfill = Backfill(partial(process_blocks_transactions, client=self.rpc),
+                                 BACKFILL_CONCURRENCY, BACKFILL_BATCH, fetch_pool)
+        self.heads = HeadSource(self.rpc, subscribe_url)
+        self.pending = PendingPool(PENDING_CAPACITY, PENDING_TTL)
+        self.pending_feed = PendingFeed(self.rpc, self.pending, subscribe_url).start() if pending_txs else None
+        self.following = None
+        self.api = api
+        self.prefix = '' if default else '/' + name
+        self.directory = None if default else os.path.join('./predictions', name)
+        if self.directory is not None:
+            os.makedirs(self.directory, exist_ok=True)
+        self.snapshot = SnapshotWriter(SNAPSHOT_PATH if default else os.path.join(self.directory, 'oracle.snapshot'))
+        self.profiler = profiler if profiler is not None else BlockProfiler()
+        self.observed_fit = 0
+        self.timer = None
+        self.pending_cleared = None
+
+    def add_block(self, mined_blockdf, block_sumdf):
+        """add a mined block to the history window, hashpower window and block store"""
+        if self.history.append(mined_blockdf, block_sumdf):
+            self.last200.add_block(block_sumdf)
+            self.store.append(mined_blockdf, block_sumdf)
+            self.pending.remove(mined_blockdf.index)
+
+    def clear_pending(self, head):
+        """
+        drop pending txs mined in the blocks after the newest ingested one
+        (head-3 up to the head), which would otherwise count as pending demand
+        until those blocks are ingested themselves
+        """
+        start = head - 3 if self.pending_cleared is None else max(head - 3, self.pending_cleared + 1)
+        if not len(self.pending) or start > head:
+            self.pending_cleared = head
+            return
+        try:
+            for block_obj in self.rpc.get_blocks(range(start, head + 1), full_transactions=False):
+                self.pending.remove(block_obj['transactions'])
+            self.pending_cleared = head
+        except Exception as e:
+            print("fetching the txs of blocks %d-%d failed: %s" % (start, head, e))
+
+    def load_blocks(self, start, stop):
+        """
+        add blocks start..stop-1 in order, reading stored blocks from disk and
+        fetching the missing ranges from the node concurrently
+        """
+        def fetch(start, stop):
+            fetched = self.backfill.blocks(start, stop)
+            while True:
+                with metrics.stage('fetch'):
+                    (mined_blockdf, block_obj) = next(fetched, (None, None))
+                if block_obj is None:
+                    return
+                with metrics.stage('ingest'):
+                    self.add_block(mined_blockdf, process_block_data(mined_blockdf, block_obj))
+
+        for (mined_blockdf, block_sumdf) in self.store.blocks(start, stop):
+            number = int(block_sumdf['block_number'].iloc[0])
+            fetch(start, number)
+            with metrics.stage('ingest'):
+                self.add_block(mined_blockdf, block_sumdf)
+            start = number + 1
+        fetch(start, stop)
+
+    def init(self):
+        (safelow, standard, fast) = self.thresholds
+        self.timer = Timers(self.rpc.block_number())
+        print("\n\n**** ETH Gas Station Express Oracle (" + self.name + ") ****")
+        print ("\nSafelow = " +str(safelow)+ "% of blocks accepting.  Usually confirms in less than 30min.")
+        print ("Standard= " +str(standard)+ "% of blocks accepting. Usually confirms in less than 1.5 min.")
+        print ("Fast = " +str(fast)+ "% of blocks accepting.  Usually confirms in less than .5 minute")
         print ("Fastest = all blocks accepting.  As fast as possible but you are probably overpaying.")
-        print("\nnow loading gasprice data from last 100 blocks...give me a minute")
+        print("\nnow loading gasprice data from last " +str(self.backfill_blocks)+ " blocks...give me a minute")
 
-        for pastblock in range((block-5), (block), 1):
-            (mined_blockdf, block_obj) = process_block_transactions(pastblock)
-            alltx = alltx.combine_first(mined_blockdf)
-            block_sumdf = process_block_data(mined_blockdf, block_obj,alltx)
-            blockdata = blockdata.append(block_sumdf, ignore_index = True)
+        block = self.timer.start_block
+        self.load_blocks(block-self.backfill_blocks, block)
         print ("done. now reporting gasprice recs in gwei: \n")
-        
+
         print ("\npress ctrl-c at any time to stop monitoring\n")
         print ("**** And the oracle says...**** \n")
-    
-    def update_dataframes(block):
-        nonlocal alltx
-        nonlocal blockdata
-        nonlocal timer
-        print(block)
-        # print(blockdata)
-        # print(alltx)
+
+    def catch_up(self, head):
+        """
+        ingest the mined block (3 behind) for every block from timer.process_block
+        up to the head, fetched concurrently, drop the pending txs the newer blocks
+        mined, then update recs once for the newest
+        """
+        timer = self.timer
+        if timer.lag > 1:
+            print("catching up " +str(timer.lag)+ " blocks")
+        self.load_blocks(timer.process_block-3, head-3)
+        with metrics.stage('pending'):
+            self.clear_pending(head)
+        timer.process_block = head
+        return self.update_dataframes(head-1)
+
+    def update_metrics(self):
+        trainer = self.trainer
+        metrics.inc('squid_blocks_updated_total')
+        metrics.set('squid_alltx_rows', self.history.tx_count)
+        metrics.set('squid_blockdata_rows', len(self.history))
+        models = trainer.models
+        metrics.set('squid_model_refits_total', models.refits)
+        metrics.set('squid_model_warm_fits_total', models.warm_fits)
+        if models.score is not None:
+            metrics.set('squid_model_score', models.score)
+        if trainer.fits != self.observed_fit:
+            self.observed_fit = trainer.fits
+            for (step, seconds) in list(models.timings.items()):
+                metrics.observe('squid_model_seconds', seconds, step=step)
+        for (name, stats) in list(models.stats.items()):
+            metrics.set('squid_model_current', int(name == models.model_name), model=name)
+            metrics.set('squid_candidate_score', stats['score'], model=name)
+            for step in ('fit', 'predict', 'cpu'):
+                metrics.set('squid_candidate_seconds', stats[step], model=name, step=step)
+        pending = self.pending
+        metrics.set('squid_pending_txs', len(pending))
+        metrics.set('squid_pending_evicted_total', pending.included, reason='included')
+        metrics.set('squid_pending_evicted_total', pending.expired, reason='expired')
+        metrics.set('squid_pending_evicted_total', pending.dropped, reason='capacity')
+        if self.pending_feed is not None:
+            metrics.set('squid_pending_overflow_total', self.pending_feed.overflowed)
+        for (method, (requests, mean, p50, p99)) in self.rpc.latency_summary().items():
+            metrics.set('squid_rpc_seconds', p50, method=method, quantile='0.5')
+            metrics.set('squid_rpc_seconds', p99, method=method, quantile='0.99')
+
+    def update_dataframes(self, block):
+        print(block if self.default else "%s %s" % (self.name, block))
+        (trainer, api) = (self.trainer, self.api)
         try:
-            #get minedtransactions and blockdata from previous block
-            mined_block_num = block-3
-            (mined_blockdf, block_obj) = process_block_transactions(mined_block_num)
-            alltx = alltx.combine_first(mined_blockdf)
-           
-            #process block data
-            block_sumdf = process_block_data(mined_blockdf, block_obj,alltx)
-
-            #add block data to block dataframe 
-            blockdata = blockdata.append(block_sumdf, ignore_index = True)
-
-            #get hashpower table from last 200 blocks
-            (hashpower, block_time) = analyze_last200blocks(block, blockdata)
-            predictiondf = make_predictTable(block, alltx, hashpower, block_time)
-
-            #get gpRecs
-            gprecs = get_gasprice_recs (predictiondf, block_time, block)
-            # print(gprecs)
-            gprecs = json.dumps(gprecs)
-            ###get max block and filter blocks < maxblock - 200 alltx = alltx[alltx.blocknumber > alltx.blocknumber.max()-200]
-            # print(alltx)
-
-            #####
-            ####call these first before predictiondf because that doesn't need to be called unlese these predictions are bad
-            ml_prediction_df, score = ml_methods(alltx, block_time, block)
-            print(score)
-            gprecs = make_ml_predictions_table(ml_prediction_df,block_time,block)
-
-            #every block, write gprecs, predictions    
-            write_to_json(gprecs, predictiondf,alltx)
+            #blocks up to block-3 are in the history window, blocks older than HISTORY_BLOCKS evicted
+            with metrics.stage('window'):
+                alltx = self.history.alltx()
+            with metrics.stage('pending'):
+                self.pending.expire()
+
+            #hashpower recs until the first model is trained, the model's after
+            (gprecs, predictiondf, block_time) = make_recs(alltx, self.last200, block, trainer, self.pending, self.thresholds)
+            self.heads.block_time = block_time
+            if trainer.model is not None:
+                print(trainer.models.score)
+                print("model trained on block %s (%d blocks old), lag %d" % (trainer.published_block, block - trainer.published_block, self.timer.lag))
+                if api is not None:
+                    with metrics.stage('surface'):
+                        (gasprices, blocks) = ml_predictions(trainer.model, SURFACE_GASPRICES, SURFACE_GAS)
+                        api.publish_surface(GasSurface(SURFACE_GAS, gasprices, blocks, block), self.prefix)
+
+            #every block, serve and write gprecs, predictions
+            with metrics.stage('publish'):
+                if api is not None:
+                    api.publish(gprecs, predictiondf, self.prefix)
+                    api.publish_json(self.prefix + '/pending', json.dumps(self.pending.demand()).encode())
+                self.snapshot.publish(gprecs, predictiondf)
+                write_to_json(gprecs, predictiondf,alltx, self.directory)
+            self.update_metrics()
             return True
 
-        except: 
+        except Exception:
+            metrics.inc('squid_errors_total', where='update')
             print(traceback.format_exc())
 
-    alltx = pd.DataFrame()
-    blockdata = pd.DataFrame()
-    timer = Timers(web3.eth.blockNumber)  
-    start_time = time.time()
-    init (web3.eth.blockNumber)
-    
-    while True:
+    def on_head(self, block):
+        timer = self.timer
         try:
-            block = web3.eth.blockNumber
+            timer.current_block = block
+            metrics.set('squid_head_lag_blocks', timer.lag)
             if (timer.process_block < block):
-                updated = update_dataframes(timer.process_block)
-                timer.process_block = timer.process_block + 1    
-        except:
-            pass
+                with self.profiler.block(), metrics.stage('block'):
+                    self.catch_up(block)
+        except Exception:
+            metrics.inc('squid_errors_total', where='main loop')
+            print(traceback.format_exc())
+
+    def follow(self, loop, heads):
+        """hand each new head to the `heads` asyncio.Queue of `loop`, from a daemon thread"""
+        for head in self.heads.heads():
+            loop.call_soon_threadsafe(heads.put_nowait, head)
+
+    async def run(self):
+        """
+        backfill, then update on every new head.  heads are waited for on a
+        daemon thread and handed to the event loop, and each update runs on a
+        worker thread so a slow node or fit in one network doesn't hold up
+        the others.  metrics recorded here are labelled with the network.
+        run again after a failure it picks up where it left off.
+        """
+        with metrics.labels(network=self.name):
+            if self.following is None:
+                await asyncio.to_thread(self.init)
+                self.following = asyncio.Queue()
+                threading.Thread(target=self.follow, args=(asyncio.get_running_loop(), self.following), daemon=True).start()
+            heads = self.following
+            while True:
+                head = await heads.get()
+                while not heads.empty():
+                    head = max(head, heads.get_nowait())
+                await asyncio.to_thread(self.on_head, head)
+
+
+async def supervise(oracle, restart=ORACLE_RESTART):
+    """run an oracle, starting it again `restart` seconds after it fails"""
+    while True:
+        try:
+            await oracle.run()
+        except Exception:
+            metrics.inc('squid_errors_total', where='oracle', network=oracle.name)
+            print("%s oracle failed, restarting in %d s" % (oracle.name, restart))
+            print(traceback.format_exc())
+            await asyncio.sleep(restart)
 
-        time.sleep(1)
 
-master_control()
+async def run_oracles(oracles):
+    """run oracles in one event loop until cancelled, each restarted on its own when it fails"""
+    await asyncio.gather(*(supervise(oracle) for oracle in oracles))
 
+
+def master_control():
+    """an Oracle for each of NETWORKS, scheduled in one event loop with shared pools"""
+    api = GasAPI(API_HOST, API_PORT, metrics).start() if API_HOST is not None else None
+    training_pool = ProcessPoolExecutor(max_workers=TRAINING_WORKERS) if TRAINING_WORKERS else None
+    fetch_pool = ThreadPoolExecutor(max_workers=BACKFILL_CONCURRENCY)
+    profiler = BlockProfiler(PROFILE, PROFILE_PATH, PROFILE_EVERY)
+    oracles = [Oracle(name, default=(i == 0), api=api, training_pool=training_pool, fetch_pool=fetch_pool,
+                      profiler=profiler, **network_config(config, default=(i == 0)))
+               for (i, (name, config)) in enumerate(NETWORKS.items())]
+    asyncio.run(run_oracles(oracles))
+
+if __name__ == '__main__':
+    master_control()
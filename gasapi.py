@@ -0,0 +1,180 @@
+"""
+http api for the oracle's outputs: /gas (the gas price recs) and
+/predictTable served from memory as pre-serialized responses with etags,
+/price?gas=G&blocks=B answered from the latest GasSurface, and the oracle's
+metrics at /metrics.  each network's outputs are also served under its own
+prefix, /<network>/gas and so on
+"""
+import asyncio
+import hashlib
+import json
+import math
+import threading
+from urllib.parse import parse_qs
+
+
+def finite(value):
+    """`value` with nan and infinite floats replaced by None, inside dicts and lists too"""
+    if isinstance(value, dict):
+        return {key: finite(item) for (key, item) in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [finite(item) for item in value]
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def finite_json(value):
+    """json text with null for nan and infinities, which json.dumps writes as NaN, not json"""
+    return json.dumps(finite(value), allow_nan=False)
+
+
+class GasAPI():
+    """
+    a small asyncio http/1.1 server with keep-alive (http/1.0 requests get
+    one response per connection), running on its own event loop thread
+    inside the oracle process.
+
+    publish() serializes the recs and prediction table once per block and
+    builds the complete 200 and 304 responses for each path up front, so a
+    request is answered with a single write of ready made bytes.  responses
+    carry a strong ETag; a request whose If-None-Match matches gets a 304.
+    /price is computed per request, a lookup in the published surface, and
+    /metrics renders `metrics` (a metrics.Metrics) when given.  outputs
+    published with a `prefix` ('/goerli') are served under it.
+    """
+    def __init__(self, host='127.0.0.1', port=8000, metrics=None):
+        self.host = host
+        self.port = port
+        self.metrics = metrics
+        self.routes = {}
+        self.surfaces = {}
+        self.requests = 0
+        self.not_modified = 0
+        self.server = None
+        self.ready = threading.Event()
+
+    @staticmethod
+    def _responses(body):
+        """(etag, full 200 response, headers only 200 response, full 304 response) for a json body"""
+        etag = '"%s"' % hashlib.blake2b(body, digest_size=8).hexdigest()
+        headers = ('Content-Type: application/json\r\n'
+                   'Access-Control-Allow-Origin: *\r\n'
+                   'Cache-Control: no-cache\r\n'
+                   'ETag: %s\r\n' % etag)
+        head = ('HTTP/1.1 200 OK\r\n%sContent-Length: %d\r\n\r\n' % (headers, len(body))).encode()
+        not_modified = ('HTTP/1.1 304 Not Modified\r\n%s\r\n' % headers).encode()
+        return (etag, head + body, head, not_modified)
+
+    def publish_json(self, path, body):
+        """serve `body` (bytes of json) at `path` from now on"""
+        # one dict item swap, so a request sees either the old responses or the new ones
+        self.routes[path] = self._responses(body)
+
+    def publish(self, gprecs, prediction_table, prefix=''):
+        """serialize a block's recs and prediction table (gasprice in gwei, as in predictTable.json)"""
+        self.publish_json(prefix + '/gas', finite_json(gprecs).encode())
+        table = prediction_table.assign(gasprice=prediction_table['gasprice']/10)
+        self.publish_json(prefix + '/predictTable', table.to_json(orient='records').encode())
+
+    def publish_surface(self, surface, prefix=''):
+        self.surfaces[prefix] = surface
+
+    @staticmethod
+    def _json_response(status, value):
+        body = finite_json(value).encode()
+        return ('HTTP/1.1 %s\r\nContent-Type: application/json\r\nAccess-Control-Allow-Origin: *\r\n'
+                'Cache-Control: no-cache\r\nContent-Length: %d\r\n\r\n' % (status, len(body))).encode() + body
+
+    def _metrics(self):
+        body = self.metrics.render().encode()
+        return ('HTTP/1.1 200 OK\r\nContent-Type: text/plain; version=0.0.4\r\n'
+                'Content-Length: %d\r\n\r\n' % len(body)).encode() + body
+
+    def _price(self, query, prefix=''):
+        """cheapest gas price for a tx of `gas` gas to confirm within `blocks` blocks"""
+        surface = self.surfaces.get(prefix)
+        if surface is None:
+            return self._json_response('503 Service Unavailable', {'error': 'no model trained yet'})
+        params = parse_qs(query)
+        try:
+            gas = float(params['gas'][0])
+            blocks = float(params['blocks'][0])
+            if not (math.isfinite(gas) and math.isfinite(blocks) and gas >= 0 and blocks >= 0):
+                raise ValueError
+        except (KeyError, ValueError):
+            return self._json_response('400 Bad Request', {'error': 'expected /price?gas=<gas limit>&blocks=<blocks>'})
+        gasprice = surface.cheapest(gas, blocks)
+        return self._json_response('200 OK', {'gas': gas, 'blocks': blocks,
+                                              'gasprice': None if math.isnan(gasprice) else round(gasprice, 2),
+                                              'blockNum': surface.block})
+
+    def _respond(self, method, path, etags):
+        (path, _, query) = path.partition('?')
+        if path.endswith('/price') and method == 'GET':
+            return self._price(query, path[:-len('/price')])
+        if path == '/metrics' and method == 'GET' and self.metrics is not None:
+            return self._metrics()
+        route = self.routes.get(path)
+        if route is None:
+            return b'HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n\r\n'
+        if method not in ('GET', 'HEAD'):
+            return b'HTTP/1.1 405 Method Not Allowed\r\nAllow: GET, HEAD\r\nContent-Length: 0\r\n\r\n'
+        (etag, full, head, not_modified) = route
+        if etags and (etag in etags or '*' in etags):
+            self.not_modified += 1
+            return not_modified
+        return full if method == 'GET' else head
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                lines = request.decode('latin-1').split('\r\n')
+                try:
+                    (method, path, version) = lines[0].split(' ')
+                except ValueError:
+                    writer.write(b'HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\nConnection: close\r\n\r\n')
+                    break
+                connection = ''
+                etags = None
+                for line in lines[1:]:
+                    (name, _, value) = line.partition(':')
+                    name = name.strip().lower()
+                    if name == 'if-none-match':
+                        # weak comparison, as If-None-Match allows
+                        etags = [tag.strip()[2:] if tag.strip().startswith('W/') else tag.strip() for tag in value.split(',')]
+                    elif name == 'connection':
+                        connection = value.strip().lower()
+                    elif name == 'content-length' and value.strip() != '0':
+                        # no route takes a body; read it off so the connection stays in sync
+                        await reader.readexactly(int(value))
+                keep_alive = version == 'HTTP/1.1' and connection != 'close'
+                self.requests += 1
+                writer.write(self._respond(method, path, etags))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _serve(self):
+        self.server = await asyncio.start_server(self._handle, self.host, self.port, backlog=1024)
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.ready.set()
+        async with self.server:
+            await self.server.serve_forever()
+
+    def serve_forever(self):
+        asyncio.run(self._serve())
+
+    def start(self):
+        """serve from a daemon thread; returns once the socket is listening"""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        self.ready.wait()
+        return self
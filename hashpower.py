@@ -0,0 +1,106 @@
+"""
+incremental version of analyze_last200blocks for the main loop
+"""
+import bisect
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from sketch import PriceSketch
+
+
+class HashpowerWindow():
+    """
+    sliding window over recent block summaries.  keeps a count of blocks per
+    mingasprice (sorted) and a running sum of valid block intervals so the
+    hashpower table and avg block time don't need the window re-grouped each block.
+    the same mingasprices are also kept in a PriceSketch accurate to `alpha`.
+    """
+    def __init__(self, blocks=200, alpha=0.01):
+        self.blocks = blocks
+        self.sketch = PriceSketch(alpha)
+        self.window = deque()  # (block_number, time_mined, mingasprice)
+        self.counts = {}
+        self.prices = []
+        self.interval_sum = 0.0
+        self.interval_count = 0
+        self._curve = None
+
+    def __len__(self):
+        return len(self.window)
+
+    @staticmethod
+    def _interval(older, newer):
+        """time between consecutive blocks, None if not consecutive or negative"""
+        if newer[0] - older[0] > 1:
+            return None
+        dt = newer[1] - older[1]
+        if dt < 0 or np.isnan(dt):
+            return None
+        return dt
+
+    def add(self, block_number, time_mined, mingasprice):
+        """add the newest mined block"""
+        entry = (int(block_number), float(time_mined), float(mingasprice))
+        if self.window:
+            dt = self._interval(self.window[-1], entry)
+            if dt is not None:
+                self.interval_sum += dt
+                self.interval_count += 1
+        self.window.append(entry)
+        price = entry[2]
+        if not np.isnan(price):
+            if price in self.counts:
+                self.counts[price] += 1
+            else:
+                self.counts[price] = 1
+                bisect.insort(self.prices, price)
+            self.sketch.add(price)
+            self._curve = None
+
+    def add_block(self, block_sumdf):
+        """add the one row frame from process_block_data"""
+        row = block_sumdf.iloc[0]
+        self.add(row['block_number'], row['time_mined'], row['mingasprice'])
+
+    def advance(self, block):
+        """evict blocks that have left the window ending at `block`"""
+        while self.window and self.window[0][0] <= block - self.blocks:
+            oldest = self.window.popleft()
+            if self.window:
+                dt = self._interval(oldest, self.window[0])
+                if dt is not None:
+                    self.interval_sum -= dt
+                    self.interval_count -= 1
+            price = oldest[2]
+            if not np.isnan(price):
+                self.counts[price] -= 1
+                if self.counts[price] == 0:
+                    del self.counts[price]
+                    del self.prices[bisect.bisect_left(self.prices, price)]
+                self.sketch.remove(price)
+                self._curve = None
+
+    def curve(self):
+        """(sorted mingasprices, block counts, cumulative hashpower pct) as arrays"""
+        if self._curve is None:
+            prices = np.array(self.prices, dtype=np.float64)
+            counts = np.array([self.counts[p] for p in self.prices], dtype=np.int64)
+            cum_blocks = np.cumsum(counts)
+            total = cum_blocks[-1] if len(cum_blocks) else 0
+            self._curve = (prices, counts, cum_blocks, cum_blocks/total*100)
+        return self._curve
+
+    def avg_timemined(self):
+        if self.interval_count == 0:
+            return 15
+        return self.interval_sum/self.interval_count
+
+    def analyze(self, block):
+        """same (hashpower, avg_timemined) as analyze_last200blocks(block, blockdata)"""
+        self.advance(block)
+        prices, counts, cum_blocks, hashp_pct = self.curve()
+        hashpower = pd.DataFrame({'count': counts, 'cum_blocks': cum_blocks, 'hashp_pct': hashp_pct},
+                                 index=pd.Index(prices, name='mingasprice'))
+        return(hashpower, self.avg_timemined())
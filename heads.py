@@ -0,0 +1,126 @@
+"""
+new chain heads for the main loop: pushed by an eth_subscribe('newHeads')
+subscription over websocket or ipc, with adaptive eth_blockNumber polling
+as the fallback
+"""
+import asyncio
+import json
+import queue
+import threading
+
+try:
+    import websockets
+except ImportError:
+    websockets = None
+
+
+class HeadSource():
+    """
+    yields block numbers of new heads as they arrive.
+
+    with a `subscribe_url` (ws://, wss:// or an ipc socket path) a background
+    thread keeps a newHeads subscription open and reconnects when it drops.
+    while there is no live subscription the head is polled `polls_per_block`
+    times per expected block interval (`block_time`, kept current from
+    avg_timemined), but never more often than every `min_interval` seconds.
+    """
+    def __init__(self, rpc, subscribe_url=None, block_time=15, polls_per_block=10, min_interval=0.25, reconnect=5):
+        self.rpc = rpc
+        self.subscribe_url = subscribe_url
+        self.block_time = block_time
+        self.polls_per_block = polls_per_block
+        self.min_interval = min_interval
+        self.reconnect = reconnect
+        self.queue = queue.Queue()
+        self.subscribed = False
+        self.head = -1
+        self.polls = 0
+        self.pushed = 0
+        if subscribe_url is not None:
+            if websockets is None and '://' in subscribe_url:
+                print("websockets is not installed, polling for new blocks instead")
+            else:
+                threading.Thread(target=self._listen, daemon=True).start()
+
+    def poll_delay(self):
+        """seconds between polls; block arrivals are close to memoryless so polls are evenly spaced"""
+        return max(self.min_interval, self.block_time / self.polls_per_block)
+
+    def heads(self):
+        """generator of increasing head block numbers, blocks until the next one"""
+        while True:
+            timeout = self.poll_delay()
+            if self.subscribed:
+                # still poll now and then in case the subscription stalls silently
+                timeout = max(timeout, 4 * self.block_time)
+            try:
+                head = self.queue.get(timeout=timeout)
+                while not self.queue.empty():
+                    head = max(head, self.queue.get_nowait())
+            except queue.Empty:
+                try:
+                    head = self.rpc.block_number()
+                    self.polls += 1
+                except Exception as e:
+                    print("polling for head failed: %s" % e)
+                    continue
+            if head > self.head:
+                self.head = head
+                yield head
+
+    def _listen(self):
+        asyncio.run(self._subscribe_forever())
+
+    async def _subscribe_forever(self):
+        while True:
+            try:
+                if '://' in self.subscribe_url:
+                    await self._subscribe_ws()
+                else:
+                    await self._subscribe_ipc()
+                print("newHeads subscription closed")
+            except Exception as e:
+                print("newHeads subscription dropped: %s" % e)
+            self.subscribed = False
+            await asyncio.sleep(self.reconnect)
+
+    @staticmethod
+    def _subscribe_request():
+        return json.dumps({'jsonrpc': '2.0', 'id': 1, 'method': 'eth_subscribe', 'params': ['newHeads']})
+
+    def _on_message(self, message):
+        if 'error' in message:
+            raise RuntimeError(message['error'])
+        if message.get('id') == 1:
+            self.subscribed = True
+        elif message.get('method') == 'eth_subscription':
+            self.pushed += 1
+            self.queue.put(int(message['params']['result']['number'], 16))
+
+    async def _subscribe_ws(self):
+        async with websockets.connect(self.subscribe_url, max_size=None) as ws:
+            await ws.send(self._subscribe_request())
+            async for message in ws:
+                self._on_message(json.loads(message))
+
+    async def _subscribe_ipc(self):
+        """geth style ipc: json objects back to back on a unix socket"""
+        reader, writer = await asyncio.open_unix_connection(self.subscribe_url)
+        writer.write(self._subscribe_request().encode())
+        decoder = json.JSONDecoder()
+        buffer = ''
+        try:
+            while True:
+                data = await reader.read(65536)
+                if not data:
+                    return
+                buffer += data.decode()
+                while buffer:
+                    try:
+                        message, end = decoder.raw_decode(buffer)
+                    except ValueError:
+                        break
+                    buffer = buffer[end:].lstrip()
+                    self._on_message(message)
+        finally:
+            writer.close()
@@ -0,0 +1,210 @@
+"""
+pending transactions from the node's mempool, held in a bounded pool
+bucketed by gas price so the recs can react to demand before it is mined
+"""
+import asyncio
+import json
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from rpc import RPCError
+
+try:
+    import websockets
+except ImportError:
+    websockets = None
+
+# price buckets in the oracle's 0.1 gwei units, the grid make_predictTable uses;
+# bucket i holds prices from GRID[i] up to GRID[i+1], the last everything from 100 gwei
+GRID = np.concatenate([np.arange(0, 10, 1), np.arange(10, 1010, 10)])
+
+
+class PendingPool():
+    """
+    pending txs by hash, with a tx count and gas total per price bucket.  a tx
+    leaves when a mined block includes it, once it has been pending `ttl`
+    seconds, or, oldest first, when more than `capacity` are held.  safe to
+    add from a feed thread while the main loop removes and reads.
+    """
+    def __init__(self, capacity=50000, ttl=600):
+        self.capacity = capacity
+        self.ttl = ttl
+        self.txs = OrderedDict()
+        self.counts = np.zeros(len(GRID), dtype=np.int64)
+        self.gas = np.zeros(len(GRID), dtype=np.float64)
+        self.lock = threading.Lock()
+        self.added = 0
+        self.included = 0
+        self.expired = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self.txs)
+
+    def _discard(self, entries):
+        """take popped (bucket, gas, seen) entries out of the bucket totals"""
+        if entries:
+            (buckets, gas, _) = zip(*entries)
+            np.subtract.at(self.counts, list(buckets), 1)
+            np.subtract.at(self.gas, list(buckets), gas)
+
+    def add_many(self, hashes, gas_prices, gas, now=None):
+        """add txs (hash bytes, gas price in wei, gas limit) not already pending"""
+        now = time.time() if now is None else now
+        buckets = np.searchsorted(GRID, np.asarray(gas_prices, dtype=np.float64) / 1e8, side='right') - 1
+        with self.lock:
+            txs = self.txs
+            new_buckets, new_gas = [], []
+            for (tx_hash, bucket, tx_gas) in zip(hashes, buckets.tolist(), gas):
+                if tx_hash not in txs:
+                    txs[tx_hash] = (bucket, tx_gas, now)
+                    new_buckets.append(bucket)
+                    new_gas.append(tx_gas)
+            if new_buckets:
+                np.add.at(self.counts, new_buckets, 1)
+                np.add.at(self.gas, new_buckets, new_gas)
+            self.added += len(new_buckets)
+            dropped = [txs.popitem(last=False)[1] for _ in range(len(txs) - self.capacity)]
+            self._discard(dropped)
+            self.dropped += len(dropped)
+
+    def remove(self, hashes):
+        """drop txs a mined block included"""
+        with self.lock:
+            included = [entry for entry in (self.txs.pop(tx_hash, None) for tx_hash in hashes) if entry is not None]
+            self._discard(included)
+            self.included += len(included)
+
+    def expire(self, now=None):
+        """drop txs pending longer than ttl"""
+        cutoff = (time.time() if now is None else now) - self.ttl
+        with self.lock:
+            expired = []
+            txs = self.txs
+            while txs and next(iter(txs.values()))[2] < cutoff:
+                expired.append(txs.popitem(last=False)[1])
+            self._discard(expired)
+            self.expired += len(expired)
+
+    def _ahead(self):
+        """pending gas in each bucket and all above it, with a trailing 0"""
+        with self.lock:
+            gas = self.gas.copy()
+        return np.append(np.cumsum(gas[::-1])[::-1], 0)
+
+    def gas_ahead(self, gasprices):
+        """pending gas paying at least each price (0.1 gwei units), counting whole buckets only"""
+        return self._ahead()[np.searchsorted(GRID, gasprices, side='left')]
+
+    def cheapest_clearing(self, gas):
+        """cheapest bucket price (0.1 gwei units) with at most `gas` pending gas paying as much or more"""
+        i = int(np.argmax(self._ahead() <= gas))
+        return GRID[min(i, len(GRID) - 1)]
+
+    def demand(self):
+        """pending count, gas and gas at or above each bucket price (gwei), as a list of dicts"""
+        ahead = self._ahead()
+        with self.lock:
+            counts = self.counts.copy()
+            gas = self.gas.copy()
+        return [{'gasprice': price / 10, 'count': int(count), 'gas': float(g), 'gas_ahead': float(a)}
+                for (price, count, g, a) in zip(GRID.tolist(), counts, gas, ahead)]
+
+
+class PendingFeed():
+    """
+    fills a PendingPool from the node.  with a websocket `subscribe_url` it
+    holds an eth_subscribe('newPendingTransactions') subscription, otherwise
+    it polls an eth_newPendingTransactionFilter every `poll_interval`
+    seconds.  nodes that announce only hashes get them looked up with
+    batched eth_getTransactionByHash calls of up to `batch_size`; at most
+    the pool's capacity of hashes wait for a lookup, and announcements past
+    that are dropped and counted in `overflowed`.
+    """
+    def __init__(self, rpc, pool, subscribe_url=None, poll_interval=1.0, batch_size=500, reconnect=5):
+        self.rpc = rpc
+        self.pool = pool
+        self.subscribe_url = subscribe_url
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.reconnect = reconnect
+        self.hashes = queue.Queue(maxsize=pool.capacity)
+        self.lookups = 0
+        self.overflowed = 0
+
+    def start(self):
+        if self.subscribe_url is not None and '://' in self.subscribe_url and websockets is not None:
+            threading.Thread(target=lambda: asyncio.run(self._subscribe_forever()), daemon=True).start()
+        else:
+            threading.Thread(target=self._poll_forever, daemon=True).start()
+        threading.Thread(target=self._lookup_forever, daemon=True).start()
+        return self
+
+    def _add(self, txs):
+        """add json tx objects still pending"""
+        txs = [tx for tx in txs if tx is not None and tx.get('blockNumber') is None]
+        if txs:
+            self.pool.add_many([bytes.fromhex(tx['hash'][2:]) for tx in txs],
+                               [int(tx['gasPrice'], 16) for tx in txs],
+                               [int(tx['gas'], 16) for tx in txs])
+
+    def _lookup_forever(self):
+        while True:
+            batch = [self.hashes.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.hashes.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._add(self.rpc.batch([('eth_getTransactionByHash', (tx_hash,)) for tx_hash in batch]))
+                self.lookups += len(batch)
+            except Exception as e:
+                print("pending tx lookup failed: %s" % e)
+
+    def _announced(self, items):
+        txs = [item for item in items if isinstance(item, dict)]
+        self._add(txs)
+        for item in items:
+            if isinstance(item, str):
+                try:
+                    self.hashes.put_nowait(item)
+                except queue.Full:
+                    self.overflowed += 1
+
+    def _poll_forever(self):
+        filter_id = None
+        while True:
+            try:
+                if filter_id is None:
+                    filter_id = self.rpc.call('eth_newPendingTransactionFilter')
+                self._announced(self.rpc.call('eth_getFilterChanges', filter_id))
+            except RPCError as e:
+                # filters time out on the node when not polled; make a new one
+                print("pending tx filter: %s" % e)
+                filter_id = None
+            except Exception as e:
+                print("pending tx poll failed: %s" % e)
+            time.sleep(self.poll_interval)
+
+    async def _subscribe_forever(self):
+        request = json.dumps({'jsonrpc': '2.0', 'id': 1, 'method': 'eth_subscribe', 'params': ['newPendingTransactions']})
+        while True:
+            try:
+                async with websockets.connect(self.subscribe_url, max_size=None) as ws:
+                    await ws.send(request)
+                    async for message in ws:
+                        message = json.loads(message)
+                        if 'error' in message:
+                            raise RuntimeError(message['error'])
+                        if message.get('method') == 'eth_subscription':
+                            result = message['params']['result']
+                            self._announced(result if isinstance(result, list) else [result])
+                print("pending tx subscription closed")
+            except Exception as e:
+                print("pending tx subscription dropped: %s" % e)
+            await asyncio.sleep(self.reconnect)
@@ -0,0 +1,142 @@
+"""
+latency histograms, counters and gauges for the oracle, rendered in the
+prometheus text exposition format
+"""
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# seconds, from a fast pandas call to a slow model refit
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# labels Metrics.labels() adds in the current thread or asyncio task
+_LABELS = contextvars.ContextVar('squid_metric_labels', default=())
+
+
+class Histogram():
+    """counts of observations at or below each bucket bound, plus their sum"""
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """[(upper bound, observations at or below it)], ending with +Inf"""
+        total = 0
+        bounds = []
+        for (bound, count) in zip(self.buckets + [float('inf')], self.counts):
+            total += count
+            bounds.append((bound, total))
+        return bounds
+
+
+def _labels(labels, **extra):
+    labels = dict(labels, **extra)
+    if not labels:
+        return ''
+    return '{%s}' % ','.join('%s="%s"' % (k, str(v).replace('\\', '\\\\').replace('"', '\\"'))
+                             for (k, v) in sorted(labels.items()))
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metrics():
+    """
+    a registry of named metrics, each with any number of label sets.
+    describe() gives a metric its prometheus type and help text; metrics
+    used without it are exported as untyped.  safe to update from one thread
+    while another renders.  labels() adds labels to everything recorded in a
+    context, so several oracles can share one registry.
+    """
+    def __init__(self):
+        self.kinds = {}
+        self.help = {}
+        self.histograms = {}
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def describe(self, name, kind, text):
+        self.kinds[name] = kind
+        self.help[name] = text
+
+    @staticmethod
+    def _key(name, labels):
+        return (name, tuple(sorted(dict(_LABELS.get(), **labels).items())))
+
+    @contextmanager
+    def labels(self, **labels):
+        """add `labels` to what is recorded inside, in this thread or asyncio task"""
+        token = _LABELS.set(tuple(sorted(dict(_LABELS.get(), **labels).items())))
+        try:
+            yield
+        finally:
+            _LABELS.reset(token)
+
+    def observe(self, name, value, **labels):
+        key = self._key(name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def stage(self, stage):
+        """time the block into squid_stage_seconds{stage=...}, failed runs included"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe('squid_stage_seconds', time.perf_counter() - start, stage=stage)
+
+    def inc(self, name, amount=1, **labels):
+        key = self._key(name, labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def set(self, name, value, **labels):
+        key = self._key(name, labels)
+        with self.lock:
+            self.values[key] = value
+
+    def stage_summary(self):
+        """{stage: (count, mean seconds)} for printing, over all other labels"""
+        totals = {}
+        with self.lock:
+            for ((name, labels), h) in self.histograms.items():
+                if name == 'squid_stage_seconds':
+                    (count, total) = totals.get(dict(labels)['stage'], (0, 0.0))
+                    totals[dict(labels)['stage']] = (count + h.count, total + h.sum)
+        return {stage: (count, total / count) for (stage, (count, total)) in totals.items() if count}
+
+    def render(self):
+        """all metrics in the prometheus text format"""
+        by_name = {}
+        with self.lock:
+            for ((name, labels), histogram) in self.histograms.items():
+                lines = by_name.setdefault(name, [])
+                for (bound, count) in histogram.cumulative():
+                    lines.append('%s_bucket%s %d' % (name, _labels(labels, le=_number(float(bound))), count))
+                lines.append('%s_sum%s %s' % (name, _labels(labels), _number(histogram.sum)))
+                lines.append('%s_count%s %d' % (name, _labels(labels), histogram.count))
+            for ((name, labels), value) in self.values.items():
+                by_name.setdefault(name, []).append('%s%s %s' % (name, _labels(labels), _number(value)))
+        out = []
+        for name in sorted(by_name):
+            if name in self.help:
+                out.append('# HELP %s %s' % (name, self.help[name]))
+            out.append('# TYPE %s %s' % (name, self.kinds.get(name, 'untyped')))
+            out.extend(by_name[name])
+        return '\n'.join(out) + '\n'
@@ -0,0 +1,341 @@
+"""
+gas price models, the policy for when to retrain them and the candidate
+model families a refit chooses between.  sklearn is imported on the first
+fit, not with this module, so the oracle and tools that only read models
+start without it
+"""
+import copy
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+FEATURES = ['gas', 'round_gp_10gwei', 'tx_cost']
+
+
+def make_pipeline(n_estimators=300):
+    from sklearn.decomposition import PCA, TruncatedSVD
+    from sklearn.ensemble import GradientBoostingRegressor
+    from sklearn.pipeline import FeatureUnion, Pipeline
+    union = FeatureUnion([("pca", PCA(n_components=1)),
+                          ("svd", TruncatedSVD(n_components=2))])
+    return Pipeline([('union', union), ('grad', GradientBoostingRegressor(n_estimators=n_estimators, learning_rate=1.0, max_depth=1, random_state=0))])
+
+
+def make_ridge():
+    from sklearn.linear_model import Ridge
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import StandardScaler
+    return Pipeline([('scale', StandardScaler()), ('ridge', Ridge(alpha=1.0))])
+
+
+def make_hist_gradient_boosting():
+    from sklearn.ensemble import HistGradientBoostingRegressor
+    return HistGradientBoostingRegressor(max_iter=200, random_state=0)
+
+
+def make_quantile(quantile=0.5):
+    """boosted trees fitting a quantile of hashpower accepting instead of its mean"""
+    from sklearn.ensemble import HistGradientBoostingRegressor
+    return HistGradientBoostingRegressor(loss='quantile', quantile=quantile, max_iter=200, random_state=0)
+
+
+# candidate model families by name, each a function returning an unfitted regressor
+REGISTRY = {'gradient_boosting': make_pipeline,
+            'ridge': make_ridge,
+            'hist_gradient_boosting': make_hist_gradient_boosting,
+            'quantile_p50': make_quantile}
+
+
+def split_features(alltx):
+    """train/test split of the model features and the hashpower_accepting target"""
+    from sklearn.model_selection import train_test_split
+    alltx['tx_cost'] = alltx.gas * alltx.round_gp_10gwei
+    X = alltx[FEATURES]
+    y = alltx['hashpower_accepting']
+    return train_test_split(X, y, test_size=0.33, random_state=42)
+
+
+def check_model(model, X_test, y_test):
+    return model.score(X_test, y_test)
+
+
+def fit_candidate(name, model, X_train, y_train, X_test, y_test):
+    """fit and check_model one candidate: {name, model, score, fit, predict (seconds), cpu (seconds of this process)}"""
+    X_train = pd.DataFrame(X_train, columns=FEATURES, copy=False)
+    X_test = pd.DataFrame(X_test, columns=FEATURES, copy=False)
+    cpu = time.process_time()
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit = time.perf_counter() - start
+    start = time.perf_counter()
+    score = check_model(model, X_test, y_test)
+    predict = time.perf_counter() - start
+    return {'name': name, 'model': model, 'score': score, 'fit': fit, 'predict': predict,
+            'cpu': time.process_time() - cpu}
+
+
+def _share(arrays):
+    """copy float arrays into one shared memory block; (block, layout) for _fit_shared"""
+    arrays = [np.ascontiguousarray(array, dtype=np.float64) for array in arrays]
+    block = shared_memory.SharedMemory(create=True, size=max(1, sum(array.nbytes for array in arrays)))
+    (layout, offset) = ([], 0)
+    for array in arrays:
+        np.ndarray(array.shape, np.float64, block.buf, offset)[...] = array
+        layout.append((array.shape, offset))
+        offset += array.nbytes
+    return block, layout
+
+
+def _fit_shared(name, model, block_name, layout):
+    """fit_candidate in a worker process, on read only views of the parent's shared arrays"""
+    block = shared_memory.SharedMemory(name=block_name)
+    try:
+        arrays = [np.ndarray(shape, np.float64, block.buf, offset) for (shape, offset) in layout]
+        for array in arrays:
+            array.flags.writeable = False
+        result = fit_candidate(name, model, *arrays)
+        del arrays
+        return result
+    finally:
+        try:
+            block.close()
+        except BufferError:
+            # a fitted model still holds a view; the mapping goes with the process
+            pass
+
+
+class ModelManager():
+    """
+    keeps the model the oracle predicts with and decides how to train it each block.
+
+    policies:
+        'always'  refit from scratch every block
+        'warm'    keep boosting the current model with `trees_per_block` more trees,
+                  refitting once it would grow past `max_estimators`
+        'drift'   refit only when the holdout score falls more than `drift` below
+                  the score at the last refit
+        'every'   refit every `refit_every` blocks
+
+    a newly trained model only replaces the current one if it scores at least as
+    well on the same holdout, so a bad fit never displaces the last good model.
+
+    a refit fits each of `candidates` (names in REGISTRY) on the same window,
+    in a process pool when update is given one, and keeps the best by
+    check_model; warm fits go to the pool too.  candidates are fitted
+    cheapest first by their last cpu time while the cycle stays within
+    `budget` cpu seconds (None for no limit); one never fitted is always
+    tried.  `stats` keeps each candidate's last score and fit / predict /
+    cpu seconds.  'warm' boosts only the gradient_boosting pipeline and
+    refits whenever another family is current.
+    """
+    POLICIES = ('always', 'warm', 'drift', 'every')
+
+    def __init__(self, policy='drift', n_estimators=300, trees_per_block=10,
+                 max_estimators=600, drift=0.05, refit_every=20,
+                 candidates=('gradient_boosting',), budget=None):
+        if policy not in self.POLICIES:
+            raise ValueError("unknown model policy %r, expected one of %s" % (policy, self.POLICIES))
+        unknown = [name for name in candidates if name not in REGISTRY]
+        if unknown or not candidates:
+            raise ValueError("unknown candidate models %s, expected some of %s" % (unknown, list(REGISTRY)))
+        self.policy = policy
+        self.n_estimators = n_estimators
+        self.trees_per_block = trees_per_block
+        self.max_estimators = max_estimators
+        self.drift = drift
+        self.refit_every = refit_every
+        self.candidates = list(candidates)
+        self.budget = budget
+        self.stats = {}
+        self.model_name = None
+        self.model = None
+        self.score = None
+        self.fit_score = None
+        self.fitted_block = None
+        self.refits = 0
+        self.warm_fits = 0
+        # seconds spent scoring / fitting in the last update
+        self.timings = {}
+
+    def needs_refit(self, block, score):
+        if self.model is None or self.policy == 'always':
+            return True
+        if self.policy == 'every':
+            return block - self.fitted_block >= self.refit_every
+        if self.policy == 'drift':
+            return np.isnan(score) or score < self.fit_score - self.drift
+        if self.model_name != 'gradient_boosting':
+            return True
+        n_estimators = self.model.named_steps['grad'].n_estimators
+        return n_estimators + self.trees_per_block > self.max_estimators
+
+    def make(self, name):
+        return make_pipeline(self.n_estimators) if name == 'gradient_boosting' else REGISTRY[name]()
+
+    def affordable(self):
+        """candidates to fit this cycle, cheapest first, within the cpu budget"""
+        cost = {name: self.stats.get(name, {}).get('cpu', 0.0) for name in self.candidates}
+        chosen, spent = [], 0.0
+        for name in sorted(self.candidates, key=cost.get):
+            if self.budget is None or not chosen or spent + cost[name] <= self.budget:
+                chosen.append(name)
+                spent += cost[name]
+        return chosen
+
+    def refit(self, X_train, y_train, X_test, y_test, pool=None):
+        """fit the affordable candidates, in `pool` if given; (best model, its name, its score)"""
+        names = self.affordable()
+        if pool is None:
+            results = [fit_candidate(name, self.make(name), X_train, y_train, X_test, y_test) for name in names]
+        else:
+            (block, layout) = _share([X_train, y_train, X_test, y_test])
+            try:
+                futures = [pool.submit(_fit_shared, name, self.make(name), block.name, layout) for name in names]
+                results = []
+                for future in futures:
+                    try:
+                        results.append(future.result())
+                    except Exception:
+                        print(traceback.format_exc())
+            finally:
+                block.close()
+                block.unlink()
+        if not results:
+            raise RuntimeError("no candidate model could be fitted")
+        for result in results:
+            self.stats[result['name']] = {key: result[key] for key in ('score', 'fit', 'predict', 'cpu')}
+        best = max(results, key=lambda result: -np.inf if np.isnan(result['score']) else result['score'])
+        return best['model'], best['name'], best['score']
+
+    def warm_fit(self, X_train, y_train, pool=None):
+        """copy of the current model boosted with more trees on the new window, in `pool` if given"""
+        if pool is not None:
+            return pool.submit(_warm_fit, self.model, self.trees_per_block, X_train, y_train).result()
+        return _warm_fit(self.model, self.trees_per_block, X_train, y_train)
+
+    def update(self, alltx, block, pool=None):
+        """train on the current alltx window per the policy, fitting candidates in `pool`; returns (model, holdout score)"""
+        X_train, X_test, y_train, y_test = split_features(alltx)
+        start = time.perf_counter()
+        score = None if self.model is None else check_model(self.model, X_test, y_test)
+        self.timings = {'score': time.perf_counter() - start}
+        refit = self.needs_refit(block, score)
+        if not refit and self.policy != 'warm':
+            self.score = score
+            return self.model, score
+        start = time.perf_counter()
+        try:
+            if refit:
+                (candidate, name, candidate_score) = self.refit(X_train, y_train, X_test, y_test, pool)
+            else:
+                (candidate, name) = (self.warm_fit(X_train, y_train, pool), self.model_name)
+                candidate_score = check_model(candidate, X_test, y_test)
+            self.timings['fit'] = time.perf_counter() - start
+        except Exception:
+            if self.model is None:
+                raise
+            print(traceback.format_exc())
+            candidate, candidate_score = None, np.nan
+        if candidate is not None and (score is None or np.isnan(score) or candidate_score >= score):
+            self.model, self.model_name, score = candidate, name, candidate_score
+            if refit:
+                self.refits += 1
+            else:
+                self.warm_fits += 1
+        if refit:
+            self.fit_score = score
+            self.fitted_block = block
+        self.score = score
+        return self.model, score
+
+
+def _warm_fit(model, trees, X_train, y_train):
+    """copy of a fitted gradient_boosting pipeline boosted with `trees` more trees"""
+    model = copy.deepcopy(model)
+    grad = model.named_steps['grad']
+    grad.set_params(warm_start=True, n_estimators=grad.n_estimators + trees)
+    # the pca/svd union stays as fitted so the existing trees see the same features
+    grad.fit(model.named_steps['union'].transform(X_train), y_train)
+    return model
+
+
+def _update_models(models, alltx, block, pool=None):
+    """
+    runs ModelManager.update in a worker process and sends the manager back,
+    or in a thread of this process handing the candidate fits to `pool`
+    """
+    models.update(alltx, block, pool)
+    return models
+
+
+class TrainingWorker():
+    """
+    trains a ModelManager in a process pool so the main loop never waits on a fit.
+    at most one fit runs at a time; windows arriving meanwhile are skipped.  a
+    finished fit is published by swapping the `models` reference, so readers see
+    either the old manager or the new one, never a half trained model.
+    with max_workers=0 training runs inline in submit.  workers for several
+    networks can share one process `pool`, fits then queue for its processes.
+    a manager with several candidates is updated on a thread here instead,
+    so its candidates can be fitted in the pool side by side; the thread
+    works on a copy of the manager, published the same way.
+    """
+    COLUMNS = ['gas', 'round_gp_10gwei', 'hashpower_accepting']
+
+    def __init__(self, models, max_workers=1, pool=None):
+        self.models = models
+        self.pool = pool
+        if pool is None and max_workers:
+            self.pool = ProcessPoolExecutor(max_workers=max_workers)
+        self.threads = None
+        self.pending = None
+        self.published_block = None
+        self.fits = 0
+
+    @property
+    def model(self):
+        """latest published model, None before the first fit finishes"""
+        return self.models.model
+
+    @property
+    def busy(self):
+        return self.pending is not None and not self.pending.done()
+
+    def submit(self, alltx, block):
+        """start training on this window unless a fit is already running"""
+        if self.pool is None:
+            self.models.update(alltx, block)
+            self._published(block)
+            return True
+        if self.busy:
+            return False
+        # copy out of the history buffer, the worker gets its own pickled window anyway
+        window = alltx[self.COLUMNS].copy()
+        if len(self.models.candidates) > 1:
+            if self.threads is None:
+                self.threads = ThreadPoolExecutor(max_workers=1)
+            self.pending = self.threads.submit(_update_models, copy.deepcopy(self.models), window, block, self.pool)
+        else:
+            self.pending = self.pool.submit(_update_models, self.models, window, block)
+        self.pending.add_done_callback(lambda future: self._done(future, block))
+        return True
+
+    def _done(self, future, block):
+        try:
+            self.models = future.result()
+        except Exception:
+            print(traceback.format_exc())
+            return
+        self._published(block)
+
+    def _published(self, block):
+        self.published_block = block
+        self.fits += 1
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False)
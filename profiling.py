@@ -0,0 +1,105 @@
+"""
+optional profiling of the oracle's block updates: deterministic cProfile
+stats, or low overhead stack sampling written in the folded stack format
+that flamegraph.pl, speedscope and py-spy's raw output share
+"""
+import cProfile
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+
+class StackSampler():
+    """
+    samples one thread's python stack every `interval` seconds from a
+    daemon thread and counts identical stacks, while `active`
+    """
+    def __init__(self, thread_id=None, interval=0.005):
+        self.thread_id = threading.get_ident() if thread_id is None else thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.running = False
+        self.active = True
+
+    def _sample(self):
+        while self.running:
+            time.sleep(self.interval)
+            if not self.active:
+                continue
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append('%s (%s:%d)' % (code.co_name, code.co_filename, code.co_firstlineno))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        if not self.running:
+            self.running = True
+            threading.Thread(target=self._sample, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.running = False
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            for (stack, count) in self.stacks.most_common():
+                f.write('%s %d\n' % (stack, count))
+
+
+class BlockProfiler():
+    """
+    wraps each block update.  mode None does nothing, 'cprofile' profiles
+    the updates and 'sample' samples the stack of the thread running them;
+    either writes to `path` every `every` blocks
+    """
+    MODES = (None, 'cprofile', 'sample')
+
+    def __init__(self, mode=None, path='./profile.out', every=100):
+        if mode not in self.MODES:
+            raise ValueError("unknown profile mode %r, expected one of %s" % (mode, self.MODES))
+        self.mode = mode
+        self.path = path
+        self.every = every
+        self.blocks = 0
+        self.lock = threading.Lock()
+        self.profiler = cProfile.Profile() if mode == 'cprofile' else None
+        self.sampler = None
+        if mode == 'sample':
+            self.sampler = StackSampler()
+            self.sampler.active = False
+            self.sampler.start()
+
+    @contextmanager
+    def block(self):
+        """around one block update, on whichever thread runs it.  profiled updates take turns"""
+        if self.mode is None:
+            yield
+            return
+        with self.lock:
+            if self.profiler is not None:
+                self.profiler.enable()
+            if self.sampler is not None:
+                self.sampler.thread_id = threading.get_ident()
+                self.sampler.active = True
+            try:
+                yield
+            finally:
+                if self.profiler is not None:
+                    self.profiler.disable()
+                if self.sampler is not None:
+                    self.sampler.active = False
+                self.blocks += 1
+                if self.blocks % self.every == 0:
+                    self.write()
+
+    def write(self):
+        if self.profiler is not None:
+            self.profiler.dump_stats(self.path)
+        elif self.sampler is not None:
+            self.sampler.write(self.path)
@@ -0,0 +1,133 @@
+"""
+latest oracle recommendation and comparison feed for the dashboard, shared
+by every callback and stream in the app process
+"""
+import json
+import os
+import threading
+import time
+
+import requests
+
+
+class RecsCache():
+    """
+    holds the oracle's latest gas price recs.  with a `snapshot` reader they
+    come from the oracle's memory mapped snapshot, otherwise (or until the
+    snapshot exists) from API.json at `path`, re-read only when its mtime
+    changes.  either is checked every `interval` seconds by one watcher
+    thread per process however many clients are connected.  `version` goes
+    up on every change and wait() blocks until it does, which is what the
+    push stream is built on.
+    """
+    def __init__(self, path, interval=0.5, snapshot=None):
+        self.path = str(path)
+        self.interval = interval
+        self.snapshot = snapshot
+        self.value = None
+        self.version = 0
+        self.stamp = None
+        self.changed = threading.Condition()
+        self.watcher = None
+
+    def _load(self):
+        """(stamp, value) of the newest recs, or None"""
+        if self.snapshot is not None:
+            seq = self.snapshot.seq()
+            if seq:
+                if ('snapshot', seq) == self.stamp:
+                    return None
+                snapshot = self.snapshot.read(table=False)
+                if snapshot is not None:
+                    return (('snapshot', snapshot[0]), snapshot[1])
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+            if mtime == self.stamp:
+                return None
+            with open(self.path) as f:
+                return (mtime, json.load(f))
+        except (OSError, ValueError):
+            return None
+
+    def refresh(self):
+        """reload the recs if they changed since the last read"""
+        loaded = self._load()
+        if loaded is None:
+            return False
+        with self.changed:
+            (self.stamp, self.value) = loaded
+            self.version += 1
+            self.changed.notify_all()
+        return True
+
+    def _watch(self):
+        while True:
+            self.refresh()
+            time.sleep(self.interval)
+
+    def start(self):
+        if self.watcher is None:
+            self.watcher = threading.Thread(target=self._watch, daemon=True)
+            self.watcher.start()
+        return self
+
+    def get(self):
+        if self.watcher is None:
+            self.refresh()
+        return self.value
+
+    def wait(self, version, timeout=None):
+        """(version, value) once the version differs from `version`, or as is after `timeout`"""
+        with self.changed:
+            self.changed.wait_for(lambda: self.version != version and self.value is not None, timeout)
+            return self.version, self.value
+
+
+class FeedCache():
+    """
+    a remote json feed fetched by one background thread every `interval`
+    seconds (a number, or a callable so it can follow the block time) with a
+    request `timeout`.  callbacks only ever read the last good copy.  fetch
+    errors keep serving it stale until it is `ttl` seconds old, after that
+    get() returns None.
+    """
+    def __init__(self, url, interval=15, timeout=5, ttl=300):
+        self.url = url
+        self.interval = interval
+        self.timeout = timeout
+        self.ttl = ttl
+        self.session = requests.Session()
+        self.value = None
+        self.fetched = None
+        self.error = None
+        self.watcher = None
+
+    def refresh(self):
+        try:
+            response = self.session.get(self.url, timeout=self.timeout)
+            response.raise_for_status()
+            value = response.json()
+        except (requests.RequestException, ValueError) as e:
+            self.error = e
+            return False
+        self.value, self.fetched, self.error = value, time.time(), None
+        return True
+
+    def _watch(self):
+        while True:
+            self.refresh()
+            interval = self.interval() if callable(self.interval) else self.interval
+            time.sleep(interval)
+
+    def start(self):
+        if self.watcher is None:
+            self.watcher = threading.Thread(target=self._watch, daemon=True)
+            self.watcher.start()
+        return self
+
+    def get(self):
+        """last good copy, None before the first fetch or once older than ttl"""
+        value, fetched = self.value, self.fetched
+        if fetched is None or time.time() - fetched > self.ttl:
+            return None
+        return value
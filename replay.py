@@ -0,0 +1,117 @@
+"""
+offline replay of recorded blocks through the oracle's pipeline, faster than
+real time: scores each tier's recommendation against how long a tx at that
+price would actually have waited, and times the blocks processed per second
+
+    python replay.py [store path] [start block] [stop block] [model policy | none]
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import gasExpress
+from blockring import BlockRing
+from blockstore import BlockStore
+from hashpower import HashpowerWindow
+from metrics import Metrics
+from models import ModelManager, TrainingWorker
+
+TIERS = ['safeLow', 'standard', 'fast', 'fastest']
+
+
+def inclusion_delays(rec_index, prices, block_numbers, mingasprices, max_wait=200):
+    """
+    blocks from the block at rec_index until the first later block whose
+    cheapest mined tx was at or below `price` (gwei), i.e. a block that would
+    have taken a tx at that price.  empty blocks take nothing.  inf when no
+    block within `max_wait` would have, nan when the recording ends first.
+    """
+    delays = np.full(len(rec_index), np.nan)
+    for (k, (i, price)) in enumerate(zip(rec_index, prices)):
+        window = mingasprices[i + 1:i + 1 + max_wait]
+        accepting = window <= price * 10
+        if accepting.any():
+            delays[k] = block_numbers[i + 1 + accepting.argmax()] - block_numbers[i]
+        elif block_numbers[-1] - block_numbers[i] >= max_wait:
+            delays[k] = np.inf
+    return delays
+
+
+def score(recs, block_numbers, mingasprices, max_wait=200):
+    """per tier: median price, delay percentiles and how often the tx made its tier's ML_TIER_BLOCKS target"""
+    rec_index = np.searchsorted(block_numbers, recs['block'].to_numpy())
+    rows = []
+    for (tier, target) in zip(TIERS, gasExpress.ML_TIER_BLOCKS):
+        prices = recs[tier].to_numpy()
+        delays = inclusion_delays(rec_index, prices, block_numbers, mingasprices, max_wait)
+        scored = delays[~np.isnan(delays)]
+        rows.append({'tier': tier,
+                     'target_blocks': target,
+                     'recs': len(scored),
+                     'median_gwei': np.nanmedian(prices),
+                     'p50_delay': np.percentile(scored, 50) if len(scored) else np.nan,
+                     'p90_delay': np.percentile(scored, 90) if len(scored) else np.nan,
+                     'within_target': np.mean(scored <= max(target, 1)) if len(scored) else np.nan})
+    return pd.DataFrame(rows).set_index('tier')
+
+
+def replay(blocks, models=None, warmup=gasExpress.HISTORY_BLOCKS, max_wait=200, metrics=None):
+    """
+    run (block_df, block_sumdf) pairs, in block order, through the same
+    windows and make_recs as master_control, training `models` (a
+    ModelManager, or None for the hashpower recs only) inline every block.
+    recs start once `warmup` blocks are in the window.  stage timings go to
+    `metrics` (a fresh Metrics when None) for the run, the oracle's are left
+    as they were.  returns
+    (per tier scores, recs frame, blocks per second, {stage: (count, mean seconds)})
+    """
+    metrics = Metrics() if metrics is None else metrics
+    (live_metrics, gasExpress.metrics) = (gasExpress.metrics, metrics)
+    history = BlockRing(gasExpress.HISTORY_BLOCKS)
+    last200 = HashpowerWindow(200, gasExpress.SKETCH_ALPHA)
+    trainer = TrainingWorker(models, max_workers=0) if models is not None else None
+    block_numbers, mingasprices, recs = [], [], []
+    elapsed = 0.0
+    try:
+        for (block_df, block_sumdf) in blocks:
+            start = time.perf_counter()
+            if not history.append(block_df, block_sumdf):
+                continue
+            last200.add_block(block_sumdf)
+            number = int(block_sumdf['block_number'].iloc[0])
+            block_numbers.append(number)
+            mingasprices.append(float(block_sumdf['mingasprice'].iloc[0]))
+            if len(block_numbers) >= warmup:
+                # live, the recs are made for RECS_AHEAD blocks after the newest mined block in the window
+                (gprecs, _, _) = gasExpress.make_recs(history.alltx(), last200, number + gasExpress.RECS_AHEAD, trainer)
+                recs.append([number] + [gprecs[tier] for tier in TIERS])
+            elapsed += time.perf_counter() - start
+    finally:
+        gasExpress.metrics = live_metrics
+    recs = pd.DataFrame(recs, columns=['block'] + TIERS)
+    scores = score(recs, np.array(block_numbers), np.array(mingasprices), max_wait)
+    return (scores, recs, len(recs) / elapsed if elapsed else np.nan, metrics.stage_summary())
+
+
+def print_report(scores, blocks_per_second, stages=None):
+    print(scores.to_string(float_format=lambda x: '%.2f' % x))
+    print("%.1f blocks/s" % blocks_per_second)
+    for (stage, (count, mean)) in sorted((stages or {}).items()):
+        print("  %-14s %8.2f ms" % (stage, mean * 1e3))
+
+
+def main(path=gasExpress.STORE_PATH, start=0, stop=None, policy=gasExpress.MODEL_POLICY):
+    store = BlockStore(path, readonly=True)
+    if store.newest is None:
+        print("no blocks stored in %s" % path)
+        return
+    stop = store.newest + 1 if stop is None else int(stop)
+    models = None if policy == 'none' else ModelManager(policy)
+    (scores, _, blocks_per_second, stages) = replay(store.blocks(int(start), stop), models)
+    print_report(scores, blocks_per_second, stages)
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
@@ -0,0 +1,126 @@
+"""
+json-rpc transport for block fetches: pooled keep-alive connections,
+batch requests, retries with backoff and per call latency stats
+"""
+import itertools
+import time
+from collections import defaultdict, deque
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+# block and transaction fields the oracle reads, decoded from hex
+BLOCK_QUANTITIES = ('number', 'timestamp')
+TX_QUANTITIES = ('blockNumber', 'gasPrice', 'gas')
+
+
+class RPCError(Exception):
+    """error object returned by the node"""
+
+
+def decode_block(block):
+    """hex json block -> dict with ints for quantities and bytes for hashes"""
+    decoded = {field: int(block[field], 16) for field in BLOCK_QUANTITIES}
+    decoded['hash'] = bytes.fromhex(block['hash'][2:])
+    transactions = []
+    for tx in block['transactions']:
+        if isinstance(tx, str):
+            transactions.append(bytes.fromhex(tx[2:]))
+            continue
+        clean = {field: int(tx[field], 16) for field in TX_QUANTITIES}
+        clean['hash'] = bytes.fromhex(tx['hash'][2:])
+        transactions.append(clean)
+    decoded['transactions'] = transactions
+    return decoded
+
+
+class BatchRPC():
+    """
+    json-rpc client on one requests session.  connections are kept alive and
+    pooled (up to `pool_size` concurrent requests), several calls can go in one
+    POST, failed requests are retried with exponential backoff, and round trip
+    times are kept per method.
+    """
+    RETRY_STATUS = (429, 500, 502, 503, 504)
+
+    def __init__(self, url, timeout=10, retries=3, backoff=0.25, pool_size=16):
+        self.url = url
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.ids = itertools.count(1)
+        self.latency = defaultdict(lambda: deque(maxlen=1000))
+
+    def _post(self, payload, method):
+        """POST with retries on connection errors and retryable http status"""
+        for attempt in range(self.retries + 1):
+            start = time.perf_counter()
+            try:
+                response = self.session.post(self.url, json=payload, timeout=self.timeout)
+                if response.status_code not in self.RETRY_STATUS:
+                    response.raise_for_status()
+                    body = response.json()
+                    self.latency[method].append(time.perf_counter() - start)
+                    return body
+                error = requests.HTTPError("%d from %s" % (response.status_code, self.url))
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            if attempt == self.retries:
+                raise error
+            time.sleep(self.backoff * 2 ** attempt)
+
+    @staticmethod
+    def _result(response):
+        if 'error' in response:
+            raise RPCError(response['error'])
+        return response['result']
+
+    def call(self, method, *params):
+        payload = {'jsonrpc': '2.0', 'id': next(self.ids), 'method': method, 'params': list(params)}
+        return self._result(self._post(payload, method))
+
+    def batch(self, calls):
+        """send [(method, params), ...] in one request, results in the same order"""
+        if not calls:
+            return []
+        payload = [{'jsonrpc': '2.0', 'id': next(self.ids), 'method': method, 'params': list(params)}
+                   for (method, params) in calls]
+        responses = self._post(payload, 'batch')
+        if isinstance(responses, dict):
+            # some nodes answer a whole failed batch with a single error object
+            raise RPCError(responses.get('error', responses))
+        by_id = {response['id']: response for response in responses}
+        return [self._result(by_id[request['id']]) for request in payload]
+
+    def block_number(self):
+        return int(self.call('eth_blockNumber'), 16)
+
+    def get_block(self, number, full_transactions=True):
+        block = self.call('eth_getBlockByNumber', hex(number), full_transactions)
+        if block is None:
+            raise RPCError("block %d not available" % number)
+        return decode_block(block)
+
+    def get_blocks(self, numbers, full_transactions=True):
+        """several blocks in one batch request"""
+        results = self.batch([('eth_getBlockByNumber', (hex(n), full_transactions)) for n in numbers])
+        blocks = []
+        for number, block in zip(numbers, results):
+            if block is None:
+                raise RPCError("block %d not available" % number)
+            blocks.append(decode_block(block))
+        return blocks
+
+    def latency_summary(self):
+        """{method: (requests, mean, p50, p99)} in seconds over recent requests"""
+        summary = {}
+        # fetch threads add methods and samples meanwhile, so iterate copies
+        for method, samples in list(self.latency.items()):
+            samples = np.array(list(samples))
+            summary[method] = (len(samples), samples.mean(), np.percentile(samples, 50), np.percentile(samples, 99))
+        return summary
@@ -0,0 +1,99 @@
+"""
+a small mergeable quantile sketch of gas prices (DDSketch style): counts
+in logarithmic buckets, so every quantile is within a relative `alpha` of
+the exact one whatever the price range, in a few KB of fixed size state
+"""
+import numpy as np
+
+
+class PriceSketch():
+    """
+    counts of prices in buckets whose bounds grow by gamma = (1 + alpha) / (1 - alpha).
+    bucket 0 holds prices below `low`, the last one everything from `high` up.
+    all sketches with the same alpha, low and high share their buckets, so
+    merging is adding the counts and a sliding window subtracts what leaves.
+    prices are in whatever unit low and high are given in; the oracle uses
+    its 0.1 gwei units.
+    """
+    def __init__(self, alpha=0.01, low=0.1, high=1e6):
+        self.alpha = alpha
+        self.low = low
+        self.high = high
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self.log_gamma = np.log(self.gamma)
+        self.size = int(np.ceil(np.log(high / low) / self.log_gamma)) + 2
+        self.counts = np.zeros(self.size, dtype=np.int32)
+        # bucket i >= 1 holds (low * gamma**(i-2), low * gamma**(i-1)]
+        upper = low * self.gamma ** np.arange(-1, self.size - 1, dtype=np.float64)
+        upper[0] = 0
+        upper[-1] = np.inf
+        self.upper = upper
+        self.values = np.concatenate([[0], upper[1:-1] * 2 / (1 + self.gamma), [high]])
+
+    @property
+    def nbytes(self):
+        return self.counts.nbytes
+
+    @property
+    def total(self):
+        return int(self.counts.sum())
+
+    def _compatible(self, other):
+        if (self.alpha, self.low, self.high) != (other.alpha, other.low, other.high):
+            raise ValueError("sketches with different buckets can't be merged")
+
+    def keys(self, values):
+        """bucket index of each price"""
+        values = np.asarray(values, dtype=np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            keys = np.ceil(np.log(values / self.low) / self.log_gamma) + 1
+        keys = np.where(values < self.low, 0, np.clip(keys, 1, self.size - 1))
+        return keys.astype(np.int64)
+
+    def add(self, values, counts=1):
+        """count prices in, nan ignored"""
+        values = np.atleast_1d(np.asarray(values, dtype=np.float64))
+        keep = ~np.isnan(values)
+        weights = np.broadcast_to(counts, values.shape)[keep]
+        self.counts += np.bincount(self.keys(values[keep]), weights, minlength=self.size).astype(np.int32)
+        return self
+
+    def remove(self, values, counts=1):
+        """count prices out again, for a sliding window"""
+        return self.add(values, -np.asarray(counts))
+
+    def __iadd__(self, other):
+        self._compatible(other)
+        self.counts += other.counts
+        return self
+
+    def __isub__(self, other):
+        self._compatible(other)
+        self.counts -= other.counts
+        return self
+
+    def copy(self):
+        sketch = PriceSketch(self.alpha, self.low, self.high)
+        sketch.counts[:] = self.counts
+        return sketch
+
+    def quantile(self, q, upper=False):
+        """
+        lower `q` quantile(s), the smallest counted price with at least q of
+        the counts at or below it: the bucket's midpoint, within alpha of the
+        exact price, or with `upper` the bucket's upper bound, a price that
+        always has at least q of the counts at or below it.  nan when empty.
+        """
+        cumulative = np.cumsum(self.counts)
+        if cumulative[-1] <= 0:
+            return np.full(np.shape(q), np.nan)[()]
+        i = np.searchsorted(cumulative, np.maximum(np.asarray(q, dtype=np.float64) * cumulative[-1], 1), side='left')
+        values = np.minimum(self.upper, self.high) if upper else self.values
+        return values[np.minimum(i, self.size - 1)]
+
+    def cdf(self, values):
+        """fraction of the counts in buckets at or below each price's, 0 when empty"""
+        cumulative = np.cumsum(self.counts)
+        if cumulative[-1] <= 0:
+            return np.zeros(np.shape(values))[()]
+        return cumulative[self.keys(values)] / cumulative[-1]
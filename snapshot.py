@@ -0,0 +1,116 @@
+"""
+the oracle's latest recs and prediction table in a fixed layout, memory
+mapped file, so readers on the same machine get them without parsing and
+without ever seeing a half written block
+"""
+import os
+import time
+
+import numpy as np
+
+MAGIC = b'SQUIDGP1'
+RECS = ['safeLow', 'standard', 'fast', 'fastest', 'block_time']
+TABLE_COLUMNS = ['gasprice', 'hashpower_accepting']
+TABLE_ROWS = 256
+SNAPSHOT_DTYPE = np.dtype([('magic', 'S8'), ('seq', '<u8'), ('blockNum', '<i8')] +
+                          [(name, '<f8') for name in RECS] +
+                          [('rows', '<i8')] +
+                          [(name, '<f8', (TABLE_ROWS,)) for name in TABLE_COLUMNS])
+
+
+class SnapshotWriter():
+    """
+    publishes into `path` under a seqlock: the sequence number is made odd,
+    the record written in place, then the sequence made even again.  a reader
+    that saw an odd or changed sequence around its copy retries, so it always
+    gets one whole block.  the prediction table is stored with gasprice in
+    gwei, as in predictTable.json, up to TABLE_ROWS rows.
+    """
+    def __init__(self, path):
+        self.path = str(path)
+        if not os.path.exists(self.path) or os.path.getsize(self.path) != SNAPSHOT_DTYPE.itemsize:
+            # readers only map a file of the right size, so build it aside and move it in whole
+            tmp = self.path + '.tmp'
+            np.zeros((), SNAPSHOT_DTYPE).tofile(tmp)
+            os.replace(tmp, self.path)
+        self.record = np.memmap(self.path, SNAPSHOT_DTYPE, mode='r+', shape=())
+        self.record['magic'] = MAGIC
+        # a writer that died mid publish leaves the sequence odd
+        self.seq = int(self.record['seq']) + int(self.record['seq']) % 2
+
+    def publish(self, gprecs, prediction_table):
+        rows = len(prediction_table)
+        if rows > TABLE_ROWS:
+            raise ValueError("prediction table has %d rows, the snapshot holds %d" % (rows, TABLE_ROWS))
+        # everything is converted before the sequence goes odd, so readers wait only on the copy
+        gasprice = prediction_table['gasprice'].to_numpy() / 10
+        hashpower_accepting = prediction_table['hashpower_accepting'].to_numpy()
+        recs = [float(gprecs[name]) for name in RECS]
+        record = self.record
+        record['seq'] = self.seq + 1
+        record['blockNum'] = gprecs['blockNum']
+        for name, value in zip(RECS, recs):
+            record[name] = value
+        record['rows'] = rows
+        record['gasprice'][:rows] = gasprice
+        record['hashpower_accepting'][:rows] = hashpower_accepting
+        self.seq += 2
+        record['seq'] = self.seq
+
+
+class SnapshotReader():
+    """
+    reads what a SnapshotWriter publishes, from any process.  read() returns
+    None until the oracle has published.
+    """
+    def __init__(self, path, retries=1000):
+        self.path = str(path)
+        self.retries = retries
+        self.record = None
+
+    def _map(self):
+        if self.record is None:
+            try:
+                if os.path.getsize(self.path) != SNAPSHOT_DTYPE.itemsize:
+                    return None
+                record = np.memmap(self.path, SNAPSHOT_DTYPE, mode='r', shape=())
+            except (OSError, ValueError):
+                return None
+            if record['magic'] != MAGIC:
+                return None
+            self.record = record
+        return self.record
+
+    def seq(self):
+        """sequence number of the latest publish, 0 before the first; cheap enough to poll"""
+        record = self._map()
+        return 0 if record is None else int(record['seq']) & ~1
+
+    def read(self, table=True):
+        """
+        (seq, gprecs dict, prediction table frame) of the latest publish, or
+        None.  with table=False the frame is not built and None is returned in its place
+        """
+        record = self._map()
+        if record is None:
+            return None
+        for attempt in range(self.retries):
+            seq = int(record['seq'])
+            if seq % 2 == 0:
+                copy = np.array(record)
+                if int(record['seq']) == seq:
+                    break
+            if attempt % 100 == 99:
+                time.sleep(0.001)
+        else:
+            return None
+        if seq == 0:
+            return None
+        gprecs = {name: float(copy[name]) for name in RECS}
+        gprecs['blockNum'] = int(copy['blockNum'])
+        if not table:
+            return (seq, gprecs, None)
+        rows = int(copy['rows'])
+        # pandas only for readers that want the table, the dashboard's recs don't
+        import pandas as pd
+        return (seq, gprecs, pd.DataFrame({name: copy[name][:rows] for name in TABLE_COLUMNS}))
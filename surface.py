@@ -0,0 +1,53 @@
+"""
+expected confirmation blocks over gas limits x gas prices, precomputed from
+the model each block so per transaction price queries need no model call
+"""
+import numpy as np
+
+
+class GasSurface():
+    """
+    a float32 grid of expected blocks to confirm, one row per gas limit
+    bucket (ascending) and one column per gas price in gwei (ascending).
+
+    each row is kept as its running minimum over price, the fewest blocks any
+    price up to that one gets, which never increases with price.  the
+    cheapest price for a wait is then a binary search in the rows either side
+    of the gas limit, interpolated linearly between neighbouring prices and
+    between the two gas limit buckets.
+    """
+    def __init__(self, gas_limits, gasprices, blocks, block=None):
+        self.gas_limits = np.asarray(gas_limits, dtype=np.float64)
+        self.gasprices = np.asarray(gasprices, dtype=np.float32)
+        self.blocks = np.asarray(blocks, dtype=np.float32).reshape(len(self.gas_limits), len(self.gasprices))
+        # negated so every row ascends, as searchsorted wants
+        self.neg_best = -np.minimum.accumulate(self.blocks, axis=1)
+        self.block = block
+
+    @property
+    def nbytes(self):
+        return self.blocks.nbytes + self.neg_best.nbytes + self.gasprices.nbytes
+
+    def _row_price(self, row, blocks):
+        """cheapest price in row `row` expected to confirm within `blocks`, nan if none is"""
+        neg_best = self.neg_best[row]
+        i = int(np.searchsorted(neg_best, -blocks, side='left'))
+        if i == len(neg_best):
+            return np.nan
+        if i == 0 or np.isinf(neg_best[i - 1]):
+            return float(self.gasprices[i])
+        (before, at) = (-float(neg_best[i - 1]), -float(neg_best[i]))
+        # before > blocks >= at: interpolate where the row crosses `blocks`
+        frac = (before - blocks) / (before - at)
+        return float(self.gasprices[i - 1] + frac * (self.gasprices[i] - self.gasprices[i - 1]))
+
+    def cheapest(self, gas, blocks):
+        """cheapest gas price (gwei) for a tx of `gas` gas to confirm within `blocks` blocks, nan if none does"""
+        gas = min(max(gas, self.gas_limits[0]), self.gas_limits[-1])
+        hi = int(np.searchsorted(self.gas_limits, gas, side='left'))
+        if self.gas_limits[hi] == gas:
+            return self._row_price(hi, blocks)
+        lo = hi - 1
+        (p_lo, p_hi) = (self._row_price(lo, blocks), self._row_price(hi, blocks))
+        frac = (gas - self.gas_limits[lo]) / (self.gas_limits[hi] - self.gas_limits[lo])
+        return p_lo + frac * (p_hi - p_lo)
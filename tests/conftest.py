@@ -0,0 +1,28 @@
+import pytest
+
+import gasExpress
+
+
+@pytest.fixture
+def frames():
+    """function turning synthetic blocks into the (block_df, block_sumdf) pairs the oracle ingests"""
+    def frames(chain):
+        pairs = []
+        for block_obj in chain:
+            block_df = gasExpress.block_to_dataframe(block_obj)
+            pairs.append((block_df, gasExpress.process_block_data(block_df, block_obj)))
+        return pairs
+    return frames
+
+
+@pytest.fixture
+def oracle(tmp_path, monkeypatch):
+    """function making a small non-default Oracle on `rpc_url` that trains inline and writes under tmp_path"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(gasExpress, 'TRAINING_WORKERS', 0)
+
+    def oracle(rpc_url, **settings):
+        config = dict({'rpc_url': rpc_url, 'history_blocks': 50, 'hashpower_blocks': 50, 'backfill_blocks': 30,
+                       'model_candidates': ['ridge'], 'pending_txs': False}, **settings)
+        return gasExpress.Oracle('testnet', default=False, **gasExpress.network_config(config, default=False))
+    return oracle
@@ -0,0 +1,38 @@
+import threading
+import time
+
+from backfill import Backfill
+
+
+def test_blocks_in_order_with_chunks_out_of_order():
+    def fetch(numbers):
+        # later chunks finish first
+        time.sleep(0.01 * (110 - numbers[0]) / 10)
+        return [n * 2 for n in numbers]
+
+    backfill = Backfill(fetch, concurrency=4, batch_size=3)
+    try:
+        assert list(backfill.blocks(100, 110)) == [n * 2 for n in range(100, 110)]
+    finally:
+        backfill.shutdown()
+
+
+def test_at_most_concurrency_chunks_in_flight():
+    lock = threading.Lock()
+    in_flight = [0, 0]
+
+    def fetch(numbers):
+        with lock:
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight[1], in_flight[0])
+        time.sleep(0.01)
+        with lock:
+            in_flight[0] -= 1
+        return numbers
+
+    backfill = Backfill(fetch, concurrency=3, batch_size=2)
+    try:
+        assert list(backfill.blocks(0, 40)) == list(range(40))
+    finally:
+        backfill.shutdown()
+    assert in_flight[1] <= 3
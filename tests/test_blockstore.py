@@ -0,0 +1,65 @@
+import os
+
+import pytest
+
+from benchmarks.synthetic import make_chain
+from blockstore import BLOCK_DTYPE, TX_DTYPE, BlockStore
+
+
+def sizes(path):
+    return {name: os.path.getsize(os.path.join(path, name)) for name in os.listdir(path)}
+
+
+@pytest.fixture
+def torn(tmp_path, frames):
+    """a store whose last block got its txs and half its block record written"""
+    path = str(tmp_path / 'store')
+    store = BlockStore(path, segment_blocks=50)
+    blocks = frames(make_chain(8939000, 30, n_tx=20))
+    for (block_df, block_sumdf) in blocks[:-1]:
+        store.append(block_df, block_sumdf)
+    (blocks_file, txs_file) = store._files(store.segments[-1])
+    with open(txs_file, 'ab') as f:
+        f.write(b'\0' * (len(blocks[-1][0]) * TX_DTYPE.itemsize + 5))
+    with open(blocks_file, 'ab') as f:
+        f.write(b'\0' * (BLOCK_DTYPE.itemsize // 2))
+    return path, blocks
+
+
+def test_round_trip(tmp_path, frames):
+    store = BlockStore(str(tmp_path), segment_blocks=10)
+    blocks = frames(make_chain(8939000, 25, n_tx=20))
+    for (block_df, block_sumdf) in blocks:
+        assert store.append(block_df, block_sumdf)
+    assert not store.append(*blocks[3])
+    stored = list(BlockStore(str(tmp_path), segment_blocks=10).blocks(8939005, 8939020))
+    assert len(stored) == 15
+    for ((block_df, block_sumdf), (expected_df, expected_sumdf)) in zip(stored, blocks[5:20]):
+        assert (block_df.index == expected_df.index).all()
+        assert (block_df['gas_price'].to_numpy() == expected_df['gas_price'].to_numpy()).all()
+        assert block_sumdf['block_number'].iloc[0] == expected_sumdf['block_number'].iloc[0]
+
+
+def test_readonly_leaves_a_torn_tail(torn):
+    (path, blocks) = torn
+    before = sizes(path)
+    store = BlockStore(path, segment_blocks=50, readonly=True)
+    assert sizes(path) == before
+    assert store.newest == blocks[-2][1]['block_number'].iloc[0]
+    assert len(list(store.blocks(0, 10 ** 9))) == len(blocks) - 1
+    assert len(store.alltx(200)) == sum(len(block_df) for (block_df, _) in blocks[:-1])
+    with pytest.raises(ValueError):
+        store.append(*blocks[-1])
+
+
+def test_writable_repairs_a_torn_tail(torn):
+    (path, blocks) = torn
+    store = BlockStore(path, segment_blocks=50)
+    assert store.append(*blocks[-1])
+    assert len(list(BlockStore(path, segment_blocks=50).blocks(0, 10 ** 9))) == len(blocks)
+
+
+def test_readonly_missing_store(tmp_path):
+    store = BlockStore(str(tmp_path / 'missing'), readonly=True)
+    assert store.newest is None and list(store.blocks(0, 10 ** 9)) == []
+    assert not os.path.exists(tmp_path / 'missing')
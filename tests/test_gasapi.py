@@ -0,0 +1,35 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from gasapi import GasAPI, finite_json
+from surface import GasSurface
+
+
+def body(response):
+    return json.loads(response.partition(b'\r\n\r\n')[2])
+
+
+def test_finite_json():
+    value = {'safeLow': float('nan'), 'fast': np.float64('inf'), 'tiers': [1.5, float('-inf')], 'blockNum': 7}
+    assert json.loads(finite_json(value)) == {'safeLow': None, 'fast': None, 'tiers': [1.5, None], 'blockNum': 7}
+
+
+def test_gas_has_no_nan():
+    api = GasAPI()
+    table = pd.DataFrame({'gasprice': [10.0, 20.0], 'hashpower_accepting': [50.0, np.nan]})
+    api.publish({'safeLow': np.nan, 'standard': 2.0, 'blockNum': 100}, table)
+    assert body(api._respond('GET', '/gas', None)) == {'safeLow': None, 'standard': 2.0, 'blockNum': 100}
+    assert body(api._respond('GET', '/predictTable', None))[1]['hashpower_accepting'] is None
+
+
+def test_price_rejects_bad_queries():
+    api = GasAPI()
+    api.publish_surface(GasSurface([21000, 100000], [1, 2, 4], [[20, 10, 2], [40, 20, 4]], block=100))
+    response = api._respond('GET', '/price?gas=21000&blocks=10', None)
+    assert response.startswith(b'HTTP/1.1 200') and body(response) == {'gas': 21000, 'blocks': 10, 'gasprice': 2.0,
+                                                                        'blockNum': 100}
+    for query in ('gas=nan&blocks=5', 'gas=21000&blocks=inf', 'gas=-1&blocks=5', 'gas=21000&blocks=-infinity',
+                  'gas=21000', 'gas=x&blocks=5'):
+        assert api._respond('GET', '/price?' + query, None).startswith(b'HTTP/1.1 400'), query
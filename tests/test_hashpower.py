@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+
+import gasExpress
+from benchmarks.synthetic import make_chain
+from blockring import BlockRing
+from hashpower import HashpowerWindow
+
+
+def test_window_matches_analyze_last200blocks(frames):
+    chain = make_chain(8939000, 300, n_tx=20)
+    # out of order timestamps and skipped blocks exercise the interval rules
+    chain[100]['timestamp'] = chain[99]['timestamp'] - 5
+    del chain[200:203]
+    history = BlockRing(gasExpress.HISTORY_BLOCKS)
+    window = HashpowerWindow(200)
+    for (block_df, block_sumdf) in frames(chain):
+        history.append(block_df, block_sumdf)
+        window.add_block(block_sumdf)
+        block = int(block_sumdf['block_number'].iloc[0]) + 3
+        (expected, expected_time) = gasExpress.analyze_last200blocks(block, history.blockdata())
+        (hashpower, avg_time) = window.analyze(block)
+        pd.testing.assert_frame_equal(hashpower, expected, check_dtype=False)
+        assert np.isclose(avg_time, expected_time)
+
+
+def test_empty_window():
+    window = HashpowerWindow(200)
+    (hashpower, avg_time) = window.analyze(100)
+    assert len(hashpower) == 0
+    assert avg_time == 15
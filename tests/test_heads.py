@@ -0,0 +1,50 @@
+import socket
+import time
+
+import pytest
+
+from benchmarks.fakenode import FakeChain, FakeNodeServer, FakeWSNode
+from benchmarks.synthetic import make_chain
+from heads import HeadSource
+from rpc import BatchRPC
+
+
+@pytest.fixture
+def chain():
+    return FakeChain(make_chain(8939000, 10, n_tx=1))
+
+
+def dead_url():
+    """a ws:// url nothing listens on"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return 'ws://127.0.0.1:%d' % sock.getsockname()[1]
+
+
+def test_polls_when_the_subscription_is_down(chain):
+    with FakeNodeServer(chain) as node:
+        heads = HeadSource(BatchRPC(node.url), dead_url(), block_time=1, min_interval=0.05, reconnect=60)
+        source = heads.heads()
+        assert next(source) == chain.head
+        chain.advance()
+        assert next(source) == chain.head
+        assert heads.polls >= 2 and heads.pushed == 0 and not heads.subscribed
+
+
+def test_subscription_pushes_heads(chain):
+    with FakeNodeServer(chain) as node, FakeWSNode(chain) as ws_node:
+        heads = HeadSource(BatchRPC(node.url), ws_node.url, block_time=60)
+        deadline = time.time() + 10
+        while not heads.subscribed and time.time() < deadline:
+            time.sleep(0.01)
+        assert heads.subscribed
+        polls = heads.polls
+        source = heads.heads()
+        chain.advance()
+        assert next(source) == chain.head
+        chain.advance()
+        chain.advance()
+        # heads that queued up while nobody read them come out as the newest
+        time.sleep(0.2)
+        assert next(source) == chain.head
+        assert heads.pushed == 3 and heads.polls == polls
@@ -0,0 +1,68 @@
+import time
+
+import numpy as np
+
+from benchmarks.fakenode import FakeChain, FakeNodeServer
+from benchmarks.synthetic import make_block, make_chain
+from mempool import GRID, PendingFeed, PendingPool
+from rpc import BatchRPC
+
+
+def columns(txs):
+    return ([tx['hash'] for tx in txs], [tx['gasPrice'] for tx in txs], [tx['gas'] for tx in txs])
+
+
+def test_capacity_drops_oldest():
+    txs = make_block(9000000, 1000)['transactions']
+    (hashes, gas_prices, gas) = columns(txs)
+    pool = PendingPool(capacity=300)
+    for i in range(0, 1000, 100):
+        pool.add_many(hashes[i:i + 100], gas_prices[i:i + 100], gas[i:i + 100])
+    assert len(pool) == 300 and pool.added == 1000 and pool.dropped == 700
+    assert list(pool.txs) == hashes[-300:]
+    assert pool.counts.sum() == 300 and np.isclose(pool.gas.sum(), sum(gas[-300:]))
+    # already pending txs are not counted twice
+    pool.add_many(hashes[-10:], gas_prices[-10:], gas[-10:])
+    assert len(pool) == 300 and pool.added == 1000
+
+
+def test_remove_and_expire_empty_the_buckets():
+    txs = make_block(9000001, 500)['transactions']
+    (hashes, gas_prices, gas) = columns(txs)
+    pool = PendingPool(ttl=60)
+    pool.add_many(hashes[:250], gas_prices[:250], gas[:250], now=1000)
+    pool.add_many(hashes[250:], gas_prices[250:], gas[250:], now=1030)
+    pool.remove(hashes[:100] + [b'not pending'])
+    assert pool.included == 100 and len(pool) == 400
+    pool.expire(now=1070)
+    assert pool.expired == 150 and len(pool) == 250
+    assert np.isclose(pool.gas.sum(), sum(gas[250:]))
+    pool.expire(now=1100)
+    assert len(pool) == 0 and pool.counts.sum() == 0 and abs(pool.gas.sum()) < 1e-6
+
+
+def test_cheapest_clearing():
+    pool = PendingPool()
+    # 1M gas at 50 gwei and 1M at 20 gwei
+    pool.add_many([b'a', b'b'], [50 * 10 ** 9, 20 * 10 ** 9], [1000000, 1000000])
+    assert list(pool.gas_ahead([100, 200, 500, 600])) == [2000000, 2000000, 1000000, 0]
+    assert pool.cheapest_clearing(2000000) == GRID[0]
+    assert pool.cheapest_clearing(1500000) == 210
+    assert pool.cheapest_clearing(0) == 510
+
+
+def test_flood_is_bounded():
+    chain = FakeChain(make_chain(8939000, 10, n_tx=1), latency=0.2)
+    with FakeNodeServer(chain) as node:
+        pool = PendingPool(capacity=100)
+        feed = PendingFeed(BatchRPC(node.url), pool, poll_interval=0.05, batch_size=20).start()
+        time.sleep(0.5)
+        txs = make_block(9100000, 1000)['transactions']
+        chain.send_pending(txs)
+        deadline = time.time() + 10
+        while pool.added + feed.overflowed < len(txs) and time.time() < deadline:
+            assert feed.hashes.qsize() <= pool.capacity
+            time.sleep(0.01)
+        assert pool.added + feed.overflowed == len(txs)
+        assert feed.overflowed >= len(txs) - pool.capacity - feed.batch_size
+        assert len(pool) <= pool.capacity
@@ -0,0 +1,59 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import gasExpress
+from benchmarks.synthetic import make_chain
+from blockring import BlockRing
+from hashpower import HashpowerWindow
+from models import ModelManager, TrainingWorker
+
+
+class CountingPool(ThreadPoolExecutor):
+    def __init__(self):
+        super().__init__(max_workers=2)
+        self.submitted = []
+
+    def submit(self, fn, *args, **kwargs):
+        self.submitted.append(fn.__name__)
+        return super().submit(fn, *args, **kwargs)
+
+
+@pytest.fixture
+def window(frames):
+    """an alltx window with hashpower_accepting, as the oracle trains on, and the block it is for"""
+    history = BlockRing(gasExpress.HISTORY_BLOCKS)
+    last200 = HashpowerWindow(200)
+    for (block_df, block_sumdf) in frames(make_chain(8939000, 60, n_tx=30)):
+        history.append(block_df, block_sumdf)
+        last200.add_block(block_sumdf)
+    block = history.newest + 3
+    alltx = history.alltx()
+    gasExpress.make_predictTable(block, alltx, last200.analyze(block)[0], 15)
+    return alltx, block
+
+
+def test_single_candidate_and_warm_fits_go_to_the_pool(window):
+    (alltx, block) = window
+    models = ModelManager('warm', n_estimators=10, trees_per_block=5, max_estimators=100)
+    with CountingPool() as pool:
+        models.update(alltx, block, pool)
+        models.update(alltx, block + 1, pool)
+    assert pool.submitted == ['_fit_shared', '_warm_fit']
+    assert models.refits == 1 and models.model.named_steps['grad'].n_estimators in (10, 15)
+
+
+def test_thread_path_publishes_a_copy(window):
+    (alltx, block) = window
+    live = ModelManager('always', n_estimators=10, candidates=['gradient_boosting', 'ridge'])
+    with CountingPool() as pool:
+        trainer = TrainingWorker(live, pool=pool)
+        trainer.submit(alltx, block)
+        deadline = time.time() + 60
+        while trainer.published_block is None and time.time() < deadline:
+            time.sleep(0.01)
+    assert trainer.published_block == block
+    # the manager handed in was never touched, the trained copy replaced it
+    assert live.model is None and live.stats == {}
+    assert trainer.models is not live and trainer.model is not None
@@ -0,0 +1,20 @@
+import pytest
+
+import gasExpress
+
+
+def test_default_network_uses_the_module_node():
+    settings = gasExpress.network_config({})
+    assert settings['rpc_url'] is None and settings['subscribe_url'] == gasExpress.SUBSCRIBE_URL
+
+
+def test_other_networks_need_their_own_node():
+    with pytest.raises(ValueError):
+        gasExpress.network_config({'subscribe_url': 'ws://127.0.0.1:8546'}, default=False)
+    settings = gasExpress.network_config({'rpc_url': 'http://127.0.0.1:8545'}, default=False)
+    assert settings['subscribe_url'] is None
+
+
+def test_unknown_settings():
+    with pytest.raises(ValueError):
+        gasExpress.network_config({'rpc': 'http://127.0.0.1:8545'})
@@ -0,0 +1,85 @@
+import numpy as np
+
+import gasExpress
+from benchmarks.fakenode import FakeChain, FakeNodeServer
+from benchmarks.synthetic import make_chain
+from mempool import PendingPool
+
+START = 8939000
+
+
+def held(oracle):
+    """block numbers in the history window, checking the windows hold each block and tx once"""
+    numbers = oracle.history.blockdata()['block_number'].to_numpy()
+    assert len(np.unique(numbers)) == len(numbers) and (np.diff(numbers) > 0).all()
+    alltx = oracle.history.alltx()
+    assert not alltx.index.duplicated().any()
+    assert set(alltx['block_mined']) <= set(numbers)
+    return list(numbers)
+
+
+def test_backfill_follow_and_restart(oracle, capsys):
+    chain = FakeChain(make_chain(START, 100, n_tx=10))
+    chain.head = START + 40
+    with FakeNodeServer(chain) as node:
+        first = oracle(node.url)
+        first.init()
+        assert held(first) == list(range(START + 10, START + 40))
+        assert sorted(chain.fetched) == list(range(START + 10, START + 40))
+
+        # each head ingests the blocks up to head-4, blocks already held are skipped
+        for _ in range(6):
+            chain.advance()
+            first.on_head(chain.head)
+        assert held(first) == list(range(START + 10, START + 43))
+        assert len(first.last200) == 33
+        assert first.timer.process_block == chain.head
+
+        # a head that jumps ahead catches up on every block in between
+        chain.head += 5
+        first.on_head(chain.head)
+        assert held(first) == list(range(START + 10, START + 48))
+        assert len(chain.fetched) == len(set(chain.fetched))
+
+        # a restart reads the stored blocks and fetches only those mined since
+        chain.head = START + 60
+        chain.fetched.clear()
+        second = oracle(node.url)
+        second.init()
+        assert held(second) == list(range(START + 30, START + 60))
+        assert sorted(chain.fetched) == list(range(START + 48, START + 60))
+    assert 'Traceback' not in capsys.readouterr().out
+
+
+def floors(pending):
+    return gasExpress.pending_floor({tier: 0.0 for tier in ('safeLow', 'standard', 'fast', 'fastest')}, pending)
+
+
+def test_mined_but_not_ingested_txs_are_not_pending(oracle):
+    blocks = make_chain(START, 60, n_tx=400)
+    chain = FakeChain(blocks)
+    chain.head = START + 40
+    with FakeNodeServer(chain) as node:
+        testnet = oracle(node.url)
+        testnet.init()
+        chain.advance()
+        # still waiting: two cheap small txs
+        waiting = PendingPool()
+        for pool in (testnet.pending, waiting):
+            pool.add_many([b'a' * 32, b'b' * 32], [2 * 10 ** 9, 3 * 10 ** 9], [21000, 21000])
+        # mined in the head block and the one before, neither ingested yet
+        mined = [tx for block in blocks[40:42] for tx in block['transactions']]
+        testnet.pending.add_many([tx['hash'] for tx in mined], [tx['gasPrice'] for tx in mined],
+                                 [tx['gas'] for tx in mined])
+        assert floors(testnet.pending)['fastest'] > floors(waiting)['fastest']
+
+        testnet.on_head(chain.head)
+        assert held(testnet)[-1] == START + 39
+        assert set(testnet.pending.txs) == set(waiting.txs)
+        assert floors(testnet.pending) == floors(waiting)
+
+        # the next head only asks for the block it adds
+        chain.fetched.clear()
+        chain.advance()
+        testnet.on_head(chain.head)
+        assert chain.fetched == [chain.head]
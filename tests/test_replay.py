@@ -0,0 +1,21 @@
+import gasExpress
+import replay
+from benchmarks.synthetic import make_chain
+from metrics import Metrics
+
+
+def test_replay_makes_recs_like_live(monkeypatch, frames):
+    made = []
+    make_recs = gasExpress.make_recs
+
+    def recording(alltx, last200, block, *args):
+        made.append((alltx['block_mined'].max(), block))
+        return make_recs(alltx, last200, block, *args)
+
+    monkeypatch.setattr(gasExpress, 'make_recs', recording)
+    live = gasExpress.metrics
+    metrics = Metrics()
+    (scores, recs, _, stages) = replay.replay(frames(make_chain(8939000, 60, n_tx=20)), warmup=50, metrics=metrics)
+    assert gasExpress.metrics is live
+    assert len(recs) == 11 and list(scores.index) == replay.TIERS
+    assert all(block == newest + gasExpress.RECS_AHEAD for (newest, block) in made)
@@ -0,0 +1,43 @@
+import pytest
+import requests
+
+from benchmarks.fakenode import FakeChain, FakeNodeServer
+from benchmarks.synthetic import make_chain
+from rpc import BatchRPC, RPCError
+
+
+@pytest.fixture
+def node():
+    chain = FakeChain(make_chain(8939000, 20, n_tx=5))
+    with FakeNodeServer(chain) as node:
+        yield node
+
+
+def test_get_blocks_is_one_request(node):
+    rpc = BatchRPC(node.url)
+    blocks = rpc.get_blocks(range(8939000, 8939010))
+    assert [block['number'] for block in blocks] == list(range(8939000, 8939010))
+    assert node.chain.requests == 1 and node.chain.calls == 10
+    assert blocks[3] == rpc.get_block(8939003)
+
+
+def test_missing_block_raises(node):
+    rpc = BatchRPC(node.url)
+    with pytest.raises(RPCError):
+        rpc.get_blocks([8939019, 8939020])
+
+
+def test_retries_on_503(node):
+    rpc = BatchRPC(node.url, retries=3, backoff=0.01)
+    node.chain.failures = 2
+    assert rpc.block_number() == node.chain.head
+    assert node.chain.requests == 1 and node.chain.failures == 0
+    assert rpc.latency_summary()['eth_blockNumber'][0] == 1
+
+
+def test_gives_up_after_retries(node):
+    rpc = BatchRPC(node.url, retries=2, backoff=0.01)
+    node.chain.failures = 3
+    with pytest.raises(requests.HTTPError):
+        rpc.block_number()
+    assert node.chain.requests == 0 and node.chain.failures == 0
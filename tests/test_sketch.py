@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from sketch import PriceSketch
+
+QUANTILES = [0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99]
+
+
+def exact_quantile(values, q):
+    values = np.sort(values)
+    return values[np.maximum(np.ceil(np.asarray(q) * len(values)).astype(int), 1) - 1]
+
+
+@pytest.mark.parametrize('alpha', [0.01, 0.05])
+def test_quantiles_within_alpha(alpha):
+    values = np.exp(np.random.RandomState(0).normal(5.5, 1.5, 20000))
+    sketch = PriceSketch(alpha).add(values)
+    exact = exact_quantile(values, QUANTILES)
+    assert np.all(np.abs(sketch.quantile(QUANTILES) - exact) <= alpha * exact + 1e-9)
+    # the upper bound never undercuts the exact quantile
+    assert np.all(sketch.quantile(QUANTILES, upper=True) >= exact)
+
+
+def test_merge_and_subtract_match_a_fresh_sketch():
+    rng = np.random.RandomState(1)
+    blocks = [np.exp(rng.normal(5, 1, 200)) for _ in range(10)]
+    window = PriceSketch()
+    for values in blocks:
+        window += PriceSketch().add(values)
+    window -= PriceSketch().add(blocks[0])
+    window.remove(blocks[1])
+    fresh = PriceSketch().add(np.concatenate(blocks[2:]))
+    assert (window.counts == fresh.counts).all()
+    assert window.total == 1600
+    assert window.quantile(0.5) == fresh.quantile(0.5)
+
+
+def test_edges():
+    sketch = PriceSketch(low=0.1, high=1e6)
+    assert np.isnan(sketch.quantile(0.5))
+    assert sketch.cdf(10) == 0
+    sketch.add([0, 0.05, np.nan, 1e9])
+    assert sketch.total == 3
+    assert sketch.quantile(0.5) == 0 and sketch.quantile(1) == 1e6
+    with pytest.raises(ValueError):
+        sketch += PriceSketch(alpha=0.02)